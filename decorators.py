@@ -1,12 +1,13 @@
 import functools, time
-from django.db   import connection, reset_queries
+from django.db   import connection, OperationalError
 from django.conf import settings
 
+DEADLOCK_ERROR_CODES = (1205, 1213)
+
 
 def query_debugger(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        reset_queries()
         number_of_start_queries = len(connection.queries)
         start  = time.perf_counter()
         result = func(*args, **kwargs)
@@ -18,4 +19,21 @@ def query_debugger(func):
         print(f"Finished in : {(end - start):.2f}s")
         print(f"-------------------------------------------------------------------")
         return result
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def retry_on_deadlock(retries=3, delay=0.05):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(retries + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as error:
+                    is_deadlock = bool(error.args) and (error.args[0] in DEADLOCK_ERROR_CODES or 'database is locked' in str(error))
+
+                    if not is_deadlock or attempt == retries or connection.in_atomic_block:
+                        raise
+
+                    time.sleep(delay * (2 ** attempt))
+        return wrapper
+    return decorator
@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gream.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from orders.stream import stream_application
+from users.bloom  import signup_filter
+
+# warm the signup filter once per worker instead of on the first sign-up.
+# order books are left to load per product: a warmed book goes stale within
+# the order book ttl, long before most products are asked for.
+signup_filter.build_in_background()
+
+# /orders/stream/<product_id> is served as server-sent events, the rest by django
+application = stream_application(django_application)
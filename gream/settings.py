@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
+
 from pathlib        import Path
 from gream_settings import DATABASES, SECRET_KEY, ALGORITHMS, LOGGING
 
@@ -84,6 +86,19 @@ WSGI_APPLICATION = 'gream.wsgi.application'
 DATABASES = DATABASES
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/#database-caching
+# shared by every worker so an invalidation in one process reaches all of them.
+# create the table once per database with `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND' : 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'gream_cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -156,9 +171,18 @@ CORS_ALLOW_HEADERS = (
     'x-requested-with',
 )
 
+##INTERNAL API
+# shared secret other services send in X-Internal-Token; /internal routes are closed while unset
+INTERNAL_API_TOKEN = os.environ.get('INTERNAL_API_TOKEN', '')
+
+##WEB SERVER
+# request threads per worker process, as given to gunicorn --threads
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+
 ##CRONJOBS
 CRONJOBS = [
-    ('10 00 * * *', 'orders.cron.update_bidding_status', '>> /tmp/update.log')
+    ('*/5 * * * *', 'orders.cron.update_bidding_status', '>> /tmp/update.log'),
+    ('05 * * * *', 'products.cron.prune_author_ranking', '>> /tmp/update.log')
 ]
 
 LOGGING = {
@@ -31,5 +31,9 @@ urlpatterns = [
     
     path('users', include('users.urls')),
     path('orders', include('orders.urls')),
-    path('products', include('products.urls'))
+    path('products', include('products.urls')),
+
+    # not for clients; keep /internal off the public ingress
+    path('internal/orders', include('orders.internal_urls')),
+    path('internal/users', include('users.internal_urls'))
 ]
\ No newline at end of file
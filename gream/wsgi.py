@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gream.settings')
 
 application = get_wsgi_application()
+
+from users.bloom import signup_filter
+
+# warm the signup filter once per worker instead of on the first sign-up.
+# order books are left to load per product: a warmed book goes stale within
+# the order book ttl, long before most products are asked for.
+signup_filter.build_in_background()
@@ -0,0 +1,68 @@
+import threading, time
+from collections import OrderedDict
+
+MISSING = object()
+
+# least recently used entries are evicted past maxsize, and any entry older
+# than ttl seconds is treated as a miss.
+class TTLCache:
+    def __init__(self, maxsize=10000, ttl=60, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self.timer   = timer
+        self.lock    = threading.Lock()
+        self.entries = OrderedDict()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits        = 0
+            self.misses      = 0
+            self.evictions   = 0
+            self.expirations = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key, MISSING)
+
+            if entry is not MISSING and entry[0] <= self.timer():
+                del self.entries[key]
+                self.expirations += 1
+                entry = MISSING
+
+            if entry is MISSING:
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (self.timer() + (self.ttl if ttl is None else ttl), value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+
+            return {
+                'size'       : len(self.entries),
+                'maxsize'    : self.maxsize,
+                'hits'       : self.hits,
+                'misses'     : self.misses,
+                'hit_rate'   : round(self.hits / requests, 4) if requests else 0,
+                'evictions'  : self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,139 @@
+import asyncio, json
+from collections import OrderedDict, defaultdict
+
+from asgiref.sync                 import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models             import Max
+
+from orders.events   import read_events
+from orders.models   import OrderEvent
+from products.models import Product
+
+def sse_message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'.encode('utf-8')
+
+def top_of_book(product_id):
+    return Product.objects.filter(id=product_id).values_list('current_selling_price', 'current_buying_price').first()
+
+def top_message(product_id, best_bid, best_ask):
+    return sse_message('top', {'product_id': product_id, 'best_bid': best_bid, 'best_ask': best_ask})
+
+# subscribers are bounded queues owned by the event loop; a message is encoded
+# once and the same bytes go to every queue. a slow subscriber drops its
+# oldest message instead of holding up the others.
+class Broadcaster:
+    def __init__(self, queue_size=100):
+        self.queue_size  = queue_size
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, product_id):
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers[product_id].add(queue)
+
+        return queue
+
+    def unsubscribe(self, product_id, queue):
+        queues = self.subscribers.get(product_id)
+
+        if queues is not None:
+            queues.discard(queue)
+
+            if not queues:
+                del self.subscribers[product_id]
+
+    def publish(self, product_id, message):
+        queues = self.subscribers.get(product_id, ())
+
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+        return len(queues)
+
+# a fill is logged once per side; contract ids seen this recently are not
+# printed again. ids are not compared by size since contracts commit out of order.
+SEEN_CONTRACTS = 10000
+
+# one tailer per process reads the order event log and turns it into top of
+# book and contract messages for the products somebody is subscribed to. it
+# stops when the last subscriber leaves and starts again at the head of the log.
+class OrderEventTailer:
+    def __init__(self, broadcaster, interval=0.5, batch_size=1000):
+        self.broadcaster = broadcaster
+        self.interval    = interval
+        self.batch_size  = batch_size
+        self.task        = None
+        self.reset()
+
+    def reset(self):
+        self.after     = None
+        self.gaps      = {}
+        self.contracts = OrderedDict()
+        self.tops      = {}
+
+    def is_new_contract(self, contract_id):
+        if contract_id in self.contracts:
+            return False
+
+        self.contracts[contract_id] = True
+
+        if len(self.contracts) > SEEN_CONTRACTS:
+            self.contracts.popitem(last=False)
+
+        return True
+
+    def poll(self, product_ids):
+        if self.after is None:
+            self.after = OrderEvent.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+        events, self.after, self.gaps = read_events(self.after, self.batch_size, self.gaps)
+
+        if not events:
+            return 0, []
+
+        messages = []
+        touched  = set()
+
+        for event in events:
+            is_print = event['event_type'] == OrderEvent.FILL and self.is_new_contract(event['contract_id'])
+
+            if event['product_id'] not in product_ids:
+                continue
+
+            touched.add(event['product_id'])
+
+            if is_print:
+                messages.append((event['product_id'], sse_message('contract', {
+                    'product_id' : event['product_id'],
+                    'contract_id': event['contract_id'],
+                    'price'      : event['price'],
+                    'created_at' : event['created_at'],
+                })))
+
+        for product_id, best_bid, best_ask in Product.objects.filter(id__in=touched)\
+                                                             .values_list('id', 'current_selling_price', 'current_buying_price'):
+            if self.tops.get(product_id) != (best_bid, best_ask):
+                self.tops[product_id] = (best_bid, best_ask)
+                messages.append((product_id, top_message(product_id, best_bid, best_ask)))
+
+        return len(events), messages
+
+    async def run(self):
+        while self.broadcaster.subscribers:
+            read, messages = await sync_to_async(self.poll)(set(self.broadcaster.subscribers))
+
+            for product_id, message in messages:
+                self.broadcaster.publish(product_id, message)
+
+            if read < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+        self.reset()
+
+    def ensure_started(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+broadcaster = Broadcaster()
+tailer      = OrderEventTailer(broadcaster)
@@ -0,0 +1,173 @@
+import uuid
+from collections import Counter, defaultdict
+from datetime    import datetime
+from decimal     import Decimal, InvalidOperation
+
+from django.db        import connection, transaction
+from django.db.models import Min, Max
+
+from orders.events    import order_event, record_event, record_events
+from orders.models    import Bidding, ExpiredWithin, OrderEvent, Status
+from orders.expiry    import expires_at
+from orders.matching  import match_bidding
+from orders.orderbook import order_books, order_from_bidding
+from orders.prices    import bidding_entered
+from products.models  import Product
+from products.ranking import record_buying_bid
+
+MAX_BULK_BIDDINGS = 100
+
+# Bidding.price is DecimalField(max_digits=18, decimal_places=2)
+PRICE_QUANTUM = Decimal('0.01')
+PRICE_LIMIT   = Decimal(10) ** 16
+
+def clean_price(price):
+    if not price.is_finite() or price <= 0 or price >= PRICE_LIMIT:
+        return None
+
+    quantized = price.quantize(PRICE_QUANTUM)
+    return quantized if quantized == price else None
+
+def clean_bidding(item):
+    if not isinstance(item, dict):
+        return None, 'INVALID_BIDDING'
+
+    try:
+        product_id        = int(item['product_id'])
+        bidding_type      = item['type']
+        price             = Decimal(str(item['price']))
+        expired_within_id = int(item['expired_within_id'])
+    except KeyError:
+        return None, 'KEY_ERROR'
+    except (TypeError, ValueError, InvalidOperation):
+        return None, 'INVALID_VALUE'
+
+    if bidding_type not in ['buy', 'sell']:
+        return None, 'INVALID_TYPE'
+
+    price = clean_price(price)
+
+    if price is None:
+        return None, 'INVALID_PRICE'
+
+    return {
+        'product_id'       : product_id,
+        'is_seller'        : bidding_type == 'sell',
+        'price'            : price,
+        'expired_within_id': expired_within_id,
+    }, None
+
+def get_best_open_prices(product_ids):
+    rows = Bidding.objects.filter(product_id__in=product_ids, status_id=Status.ON_BIDDING)\
+                          .values('product_id', 'is_seller')\
+                          .annotate(lowest=Min('price'), highest=Max('price'))\
+                          .order_by()
+
+    return {
+        (row['product_id'], row['is_seller']): row['lowest'] if row['is_seller'] else row['highest'] for row in rows
+    }
+
+def crosses(bidding, best_prices):
+    opposite = best_prices.get((bidding.product_id, not bidding.is_seller))
+
+    if opposite is None:
+        return False
+
+    return bidding.price <= opposite if bidding.is_seller else bidding.price >= opposite
+
+def submit_biddings(user, items):
+    results = [None] * len(items)
+    cleaned = []
+
+    for index, item in enumerate(items):
+        bidding, error = clean_bidding(item)
+
+        if error:
+            results[index] = error
+            continue
+
+        cleaned.append((index, bidding))
+
+    product_ids        = {bidding['product_id'] for _, bidding in cleaned}
+    expired_within_ids = {bidding['expired_within_id'] for _, bidding in cleaned}
+    authors            = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'author_id'))
+    periods            = dict(ExpiredWithin.objects.filter(id__in=expired_within_ids).values_list('id', 'period'))
+    now                = datetime.now()
+
+    biddings = []
+    sides    = defaultdict(set)
+
+    for index, bidding in cleaned:
+        if bidding['product_id'] not in authors:
+            results[index] = 'PRODUCT_NOT_FOUND'
+        elif bidding['expired_within_id'] not in periods:
+            results[index] = 'EXPIRED_WITHIN_NOT_FOUND'
+        else:
+            expired_at = expires_at(periods[bidding['expired_within_id']], now)
+            biddings.append((index, Bidding(user=user, status_id=Status.ON_BIDDING, expired_at=expired_at, **bidding)))
+            sides[bidding['product_id']].add(bidding['is_seller'])
+
+    if not biddings:
+        return results
+
+    with transaction.atomic():
+        best_prices = get_best_open_prices(sides.keys())
+
+        resting = []
+        created = []
+
+        for index, bidding in biddings:
+            if not crosses(bidding, best_prices) and len(sides[bidding.product_id]) == 1:
+                created.append(bidding)
+                resting.append(bidding)
+                results[index] = 'NEW_BID_CREATED'
+                continue
+
+            bidding.save()
+            record_event(OrderEvent.BID, bidding)
+            created.append(bidding)
+
+            if match_bidding(bidding):
+                results[index] = 'CONTRACT_SUCCESS'
+                continue
+
+            order = order_from_bidding(bidding)
+            transaction.on_commit(lambda order=order: order_books.add(order))
+            resting.append(bidding)
+            results[index] = 'NEW_BID_CREATED'
+
+        unsaved = [bidding for bidding in resting if bidding.pk is None]
+
+        # the event log needs every id. mysql returns none from a multi-row
+        # insert, so the rows carry a key unique to this batch and are read
+        # back by it; nothing else can match it.
+        if unsaved and not connection.features.can_return_rows_from_bulk_insert:
+            batch_key = uuid.uuid4()
+
+            for bidding in unsaved:
+                bidding.batch_key = batch_key
+
+            Bidding.objects.bulk_create(unsaved)
+            unsaved = list(Bidding.objects.filter(batch_key=batch_key))
+        else:
+            Bidding.objects.bulk_create(unsaved)
+
+        record_events([order_event(OrderEvent.BID, bidding) for bidding in unsaved])
+
+        buying_counts = Counter(authors[bidding.product_id] for bidding in created if not bidding.is_seller)
+        for author_id, count in buying_counts.items():
+            record_buying_bid(author_id, created[0].created_at, count)
+
+        best_prices = {}
+        for bidding in resting:
+            key   = (bidding.product_id, bidding.is_seller)
+            price = best_prices.get(key, bidding.price)
+            best_prices[key] = min(bidding.price, price) if bidding.is_seller else max(bidding.price, price)
+
+        for (product_id, is_seller), price in best_prices.items():
+            bidding_entered(product_id, is_seller, price)
+
+        bulk_product_ids = {bidding.product_id for bidding in resting}
+        transaction.on_commit(lambda: [order_books.discard(product_id) for product_id in bulk_product_ids])
+
+    return results
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from django.db                  import transaction, IntegrityError
+from django.db.models           import F, Value, DecimalField
+from django.db.models.functions import Cast, Greatest, Least
+
+from orders.models import ContractCandle
+
+RESOLUTIONS = {
+    ContractCandle.HOURLY: lambda moment: moment.replace(minute=0, second=0, microsecond=0),
+    ContractCandle.DAILY : lambda moment: moment.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+CHART_RANGES = {
+    '1d': (ContractCandle.HOURLY, timedelta(days=1)),
+    '1w': (ContractCandle.HOURLY, timedelta(weeks=1)),
+    '1m': (ContractCandle.DAILY, timedelta(days=31)),
+    '3m': (ContractCandle.DAILY, timedelta(days=92)),
+    '1y': (ContractCandle.DAILY, timedelta(days=366)),
+}
+
+def record_contract(product_id, price, created_at):
+    for resolution, truncate in RESOLUTIONS.items():
+        candles = ContractCandle.objects.filter(product_id=product_id, resolution=resolution, started_at=truncate(created_at))
+        value   = Cast(Value(price), DecimalField(max_digits=18, decimal_places=2))
+        changes = {
+            'high'  : Greatest(F('high'), value),
+            'low'   : Least(F('low'), value),
+            'close' : value,
+            'volume': F('volume') + 1,
+        }
+
+        if candles.update(**changes):
+            continue
+
+        try:
+            with transaction.atomic():
+                ContractCandle.objects.create(
+                    product_id = product_id,
+                    resolution = resolution,
+                    started_at = truncate(created_at),
+                    open       = price,
+                    high       = price,
+                    low        = price,
+                    close      = price,
+                    volume     = 1
+                )
+        except IntegrityError:
+            candles.update(**changes)
+
+def get_candles(product_id, chart_range, now=None):
+    resolution, period = CHART_RANGES[chart_range]
+    started_at         = RESOLUTIONS[resolution]((now or datetime.now()) - period)
+
+    return ContractCandle.objects.filter(product_id=product_id, resolution=resolution, started_at__gt=started_at)\
+                                 .order_by('started_at')\
+                                 .values('started_at', 'open', 'high', 'low', 'close', 'volume')
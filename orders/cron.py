@@ -1,15 +1,9 @@
-from datetime      import datetime, timedelta
+from datetime import datetime
 
-from orders.models import Bidding
+from orders.expiry import expire_biddings
 
-def update_bidding_status(now=datetime.now()):
-    biddings = Bidding.objects.filter(status_id=1)
-    
-    for bidding in biddings:
-        date_expired = bidding.created_at + timedelta(days=bidding.expired_within.period)
+def update_bidding_status(now=None):
+    now              = now or datetime.now()
+    expired, elapsed = expire_biddings(now)
 
-        if (date_expired.year, date_expired.month, date_expired.day) == (now.year, now.month, now.day):
-            bidding.status_id = 2
-            bidding.save()
-
-    print(now)
\ No newline at end of file
+    print(f'{now} expired {expired} biddings in {elapsed:.2f}s ({expired / elapsed if elapsed else 0:.0f} rows/s)')
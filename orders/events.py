@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from orders.models import OrderEvent
+from pagination    import encode_cursor, decode_cursor
+
+EVENT_FIELDS = ('id', 'event_type', 'bidding_id', 'product_id', 'contract_id', 'is_seller', 'price', 'created_at')
+
+# ids are handed out at insert but rows appear at commit, so a missing id is
+# either a transaction still in flight or one that rolled back (innodb never
+# reuses the id). readers move past gaps and re-check the missing ids on every
+# read until the event after the gap is older than this, which is longer than
+# innodb_lock_wait_timeout (50s). late events come back out of id order.
+EVENT_GAP_TIMEOUT = timedelta(seconds=60)
+
+# jumps wider than this are purged history or auto-increment jumps, not
+# transactions in flight, and are not tracked
+MAX_GAP_SIZE = 1000
+
+def order_event(event_type, bidding, contract=None):
+    return OrderEvent(
+        event_type  = event_type,
+        bidding_id  = bidding.id,
+        product_id  = bidding.product_id,
+        contract_id = contract.id if contract else None,
+        is_seller   = bidding.is_seller,
+        price       = bidding.price
+    )
+
+def record_event(event_type, bidding, contract=None):
+    return order_event(event_type, bidding, contract).save()
+
+def record_events(events):
+    OrderEvent.objects.bulk_create(events, batch_size=1000)
+
+# gaps maps each missing id to the time it stops being waited for; pass back
+# the after_id and gaps returned by the previous read.
+def read_events(after_id=0, limit=1000, gaps=None, gap_timeout=EVENT_GAP_TIMEOUT, now=None):
+    now  = now or datetime.now()
+    gaps = dict(gaps or {})
+    late = []
+
+    if gaps:
+        late = list(OrderEvent.objects.filter(id__in=list(gaps)).order_by('id').values(*EVENT_FIELDS))
+
+        for event in late:
+            del gaps[event['id']]
+
+    events = list(OrderEvent.objects.filter(id__gt=after_id).order_by('id').values(*EVENT_FIELDS)[:limit])
+
+    for event in events:
+        if event['id'] - after_id - 1 <= MAX_GAP_SIZE:
+            for missing_id in range(after_id + 1, event['id']):
+                gaps[missing_id] = event['created_at'] + gap_timeout
+
+        after_id = event['id']
+
+    gaps = {missing_id: deadline for missing_id, deadline in gaps.items() if deadline > now}
+
+    return late + events, after_id, gaps
+
+def encode_event_cursor(after_id, gaps):
+    return encode_cursor([after_id, [[missing_id, deadline.isoformat()] for missing_id, deadline in sorted(gaps.items())]])
+
+# a bare event id is accepted as a cursor with no gaps
+def decode_event_cursor(cursor):
+    if cursor.isdigit():
+        return int(cursor), {}
+
+    after_id, gaps = decode_cursor(cursor, 2)
+
+    if not isinstance(after_id, int) or not isinstance(gaps, list):
+        raise ValueError('INVALID_CURSOR')
+
+    return after_id, {int(missing_id): datetime.fromisoformat(deadline) for missing_id, deadline in gaps}
@@ -0,0 +1,66 @@
+import time
+from collections import defaultdict
+from datetime    import datetime, timedelta
+
+from django.db import transaction
+
+from orders.events    import record_events
+from orders.models    import Bidding, OrderEvent, Status
+from orders.orderbook import order_books
+from orders.prices    import biddings_left
+
+EXPIRY_CHUNK_SIZE = 5000
+
+def expires_at(period, now=None):
+    return (now or datetime.now()) + timedelta(days=period)
+
+def expire_chunk(now, chunk_size=None, ids=None):
+    with transaction.atomic():
+        biddings = Bidding.objects.select_for_update()\
+                                  .filter(status_id=Status.ON_BIDDING, expired_at__lte=now)\
+                                  .order_by('expired_at', 'id')
+
+        if ids is not None:
+            biddings = biddings.filter(id__in=ids)
+
+        rows = list(biddings.values_list('id', 'product_id', 'is_seller', 'price')[:chunk_size])
+
+        if not rows:
+            return 0
+
+        Bidding.objects.filter(id__in=[row[0] for row in rows]).update(status_id=Status.EXPIRED, updated_at=now)
+        record_events([
+            OrderEvent(event_type=OrderEvent.EXPIRE, bidding_id=bidding_id, product_id=product_id, is_seller=is_seller, price=price)
+            for bidding_id, product_id, is_seller, price in rows
+        ])
+
+        sides = defaultdict(list)
+        for bidding_id, product_id, is_seller, price in rows:
+            sides[(product_id, is_seller)].append((bidding_id, price))
+
+        for (product_id, is_seller), biddings in sides.items():
+            if product_id is not None:
+                biddings_left(product_id, is_seller, {price for _, price in biddings})
+
+        transaction.on_commit(lambda: [
+            order_books.remove(product_id, *[bidding_id for bidding_id, _ in biddings])
+            for (product_id, _), biddings in sides.items()
+        ])
+
+        return len(rows)
+
+# every open bid due at or before now is expired, however late the job runs;
+# a re-run only finds what is still open, so it is safe to repeat.
+def expire_biddings(now=None, chunk_size=EXPIRY_CHUNK_SIZE):
+    now     = now or datetime.now()
+    started = time.monotonic()
+    expired = 0
+
+    while True:
+        count    = expire_chunk(now, chunk_size)
+        expired += count
+
+        if count < chunk_size:
+            break
+
+    return expired, time.monotonic() - started
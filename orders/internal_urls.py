@@ -0,0 +1,7 @@
+from django.urls import path
+
+from orders.views import OrderEventView
+
+urlpatterns = [
+    path('/events', OrderEventView.as_view())
+]
@@ -0,0 +1,48 @@
+import asyncio, time
+
+from django.core.management.base import BaseCommand
+
+from orders.broadcast import Broadcaster, top_message
+
+class Command(BaseCommand):
+    help = 'Benchmark in-process fan-out of order book messages to many subscribers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000)
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--products', type=int, default=1)
+
+    def handle(self, *args, **options):
+        elapsed, latencies = asyncio.run(self.bench(options['subscribers'], options['messages'], options['products']))
+        deliveries         = len(latencies)
+        latencies.sort()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{deliveries} deliveries in {elapsed:.2f}s ({deliveries / elapsed:.0f} msg/s), '
+            f'fan-out latency p50 {latencies[deliveries // 2] * 1000:.2f}ms '
+            f'p99 {latencies[int(deliveries * 0.99) - 1] * 1000:.2f}ms'
+        ))
+
+    async def bench(self, subscribers, messages, products):
+        broadcaster = Broadcaster(queue_size=messages)
+        latencies   = []
+
+        async def subscriber(queue):
+            for _ in range(messages):
+                published_at, _ = await queue.get()
+                latencies.append(time.perf_counter() - published_at)
+
+        tasks = [
+            asyncio.ensure_future(subscriber(broadcaster.subscribe(index % products + 1))) for index in range(subscribers)
+        ]
+        await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        for index in range(messages):
+            for product_id in range(1, products + 1):
+                broadcaster.publish(product_id, (time.perf_counter(), top_message(product_id, index, index + 1)))
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*tasks)
+
+        return time.perf_counter() - started, latencies
@@ -0,0 +1,52 @@
+import random, time
+
+from django.core.management.base import BaseCommand
+from django.db                   import transaction
+
+from orders.models   import Bidding, Status
+from orders.matching import match_bidding
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Measure matching engine throughput in bids per second (all writes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=2000)
+        parser.add_argument('--products', type=int, default=10)
+        parser.add_argument('--spread', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+
+        with transaction.atomic():
+            products = [
+                Product.objects.create(
+                    name                  = f'bench product {index}',
+                    current_buying_price  = 0,
+                    current_selling_price = 0,
+                    original_price        = 100000
+                ) for index in range(options['products'])
+            ]
+
+            matched = 0
+            started = time.perf_counter()
+
+            for _ in range(options['bids']):
+                bidding = Bidding.objects.create(
+                    is_seller  = generator.random() < 0.5,
+                    product    = generator.choice(products),
+                    price      = 100000 + generator.randint(-options['spread'], options['spread']) * 100,
+                    status_id  = Status.ON_BIDDING
+                )
+
+                if match_bidding(bidding):
+                    matched += 1
+
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"bids      : {options['bids']}")
+        self.stdout.write(f'contracts : {matched}')
+        self.stdout.write(f'elapsed   : {elapsed:.2f}s')
+        self.stdout.write(self.style.SUCCESS(f"throughput: {options['bids'] / elapsed:.0f} bids/s"))
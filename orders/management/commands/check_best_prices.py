@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models            import Min, Max
+
+from orders.models   import Bidding, Status
+from orders.prices   import PRICE_COLUMNS
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Report products whose denormalized best prices drifted from the open order book'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite drifted prices from the order book')
+
+    def handle(self, *args, **options):
+        rows = Bidding.objects.filter(status_id=Status.ON_BIDDING, product__isnull=False)\
+                              .values('product_id', 'is_seller')\
+                              .annotate(lowest=Min('price'), highest=Max('price'))\
+                              .order_by()
+        book = {
+            (row['product_id'], row['is_seller']): row['lowest'] if row['is_seller'] else row['highest'] for row in rows
+        }
+
+        drifted  = 0
+        products = Product.objects.order_by('id').values_list('id', *PRICE_COLUMNS.values())
+
+        for product_id, *prices in products.iterator(chunk_size=2000):
+            changes = {}
+
+            for (is_seller, column), price in zip(PRICE_COLUMNS.items(), prices):
+                expected = book.get((product_id, is_seller), 0)
+
+                if price != expected:
+                    changes[column] = expected
+                    self.stdout.write(f'product {product_id}: {column} is {price}, book says {expected}')
+
+            if changes:
+                drifted += 1
+
+                if options['fix']:
+                    Product.objects.filter(id=product_id).update(**changes)
+
+        message = f'{drifted} products drifted' + (' and were fixed' if options['fix'] and drifted else '')
+        self.stdout.write(self.style.WARNING(message) if drifted else self.style.SUCCESS(message))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from orders.expiry import EXPIRY_CHUNK_SIZE, expire_biddings
+
+class Command(BaseCommand):
+    help = 'Expire every open bid past its expired_at in chunked bulk updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=EXPIRY_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        expired, elapsed = expire_biddings(chunk_size=options['chunk_size'])
+        rate             = expired / elapsed if elapsed else 0
+
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} biddings in {elapsed:.2f}s ({rate:.0f} rows/s)'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db                   import transaction
+
+from orders.models  import Contract, ContractCandle
+from orders.candles import RESOLUTIONS
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly and daily price candles from the contracts table'
+
+    def handle(self, *args, **options):
+        candles   = {}
+        contracts = Contract.objects.filter(selling_bid__product__isnull=False)\
+                                    .order_by('created_at', 'id')\
+                                    .values_list('selling_bid__product_id', 'selling_bid__price', 'created_at')
+
+        for product_id, price, created_at in contracts.iterator(chunk_size=2000):
+            for resolution, truncate in RESOLUTIONS.items():
+                key    = (product_id, resolution, truncate(created_at))
+                candle = candles.get(key)
+
+                if candle is None:
+                    candles[key] = ContractCandle(
+                        product_id = product_id,
+                        resolution = resolution,
+                        started_at = key[2],
+                        open       = price,
+                        high       = price,
+                        low        = price,
+                        close      = price,
+                        volume     = 1
+                    )
+                    continue
+
+                candle.high    = max(candle.high, price)
+                candle.low     = min(candle.low, price)
+                candle.close   = price
+                candle.volume += 1
+
+        with transaction.atomic():
+            ContractCandle.objects.all().delete()
+            ContractCandle.objects.bulk_create(candles.values(), batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(candles)} candles'))
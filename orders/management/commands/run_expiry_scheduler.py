@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from orders.scheduler import ExpiryScheduler
+
+class Command(BaseCommand):
+    help = 'Run the expiry service that closes open bids within seconds of their deadline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, default=10, help='Minutes of upcoming deadlines kept in memory')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds between polls for new bids')
+
+    def handle(self, *args, **options):
+        scheduler = ExpiryScheduler(timedelta(minutes=options['horizon']), options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Expiry scheduler started, horizon {options["horizon"]}m'))
+        scheduler.run(lambda now, expired: self.stdout.write(f'{now} expired {expired} biddings'))
@@ -0,0 +1,78 @@
+import random, threading, time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db                   import connection
+
+from orders.models   import Bidding, Contract, Status
+from orders.matching import take_bidding
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Race concurrent takers for the same asks and check that no bid is filled twice'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--bids', type=int, default=200)
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(
+            name                  = 'stress product',
+            current_buying_price  = 0,
+            current_selling_price = 0,
+            original_price        = 100000
+        )
+        asks = [
+            Bidding.objects.create(
+                is_seller  = True,
+                product    = product,
+                price      = 100000 + index,
+                status_id  = Status.ON_BIDDING
+            ).id for index in range(options['bids'])
+        ]
+
+        fills  = Counter()
+        errors = []
+        lock   = threading.Lock()
+
+        def taker(seed):
+            order = asks[:]
+            random.Random(seed).shuffle(order)
+
+            try:
+                for ask_id in order:
+                    if take_bidding(None, product.id, ask_id, maker_is_seller=True):
+                        with lock:
+                            fills[ask_id] += 1
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=taker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed     = time.perf_counter() - started
+        contracts   = Contract.objects.filter(selling_bid__product=product).count()
+        double_fill = [ask_id for ask_id, count in fills.items() if count > 1]
+        orphans     = Bidding.objects.filter(product=product, status_id=Status.ON_BIDDING, is_seller=False).count()
+
+        Contract.objects.filter(selling_bid__product=product).delete()
+        Bidding.objects.filter(product=product).delete()
+        product.delete()
+
+        self.stdout.write(f"threads    : {options['threads']}")
+        self.stdout.write(f'contracts  : {contracts} / {len(asks)}')
+        self.stdout.write(f'errors     : {len(errors)}')
+        self.stdout.write(f'elapsed    : {elapsed:.2f}s')
+        self.stdout.write(f'throughput : {contracts / elapsed:.0f} contracts/s')
+
+        if double_fill or orphans or errors or contracts != sum(fills.values()):
+            raise CommandError(f'double fills: {double_fill}, orphan takers: {orphans}, errors: {errors[:3]}')
+
+        self.stdout.write(self.style.SUCCESS('no double fills'))
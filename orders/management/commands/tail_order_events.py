@@ -0,0 +1,33 @@
+import json, time
+
+from django.core.management.base  import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from orders.events import read_events
+
+class Command(BaseCommand):
+    help = 'Stream order events as JSON lines, starting after the given event id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--interval', type=float, default=0.5)
+
+    def handle(self, *args, **options):
+        after = options['after']
+        gaps  = {}
+
+        while True:
+            events, after, gaps = read_events(after, options['batch_size'], gaps)
+
+            for event in events:
+                self.stdout.write(json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False))
+
+            if len(events) == options['batch_size']:
+                continue
+
+            if not options['follow']:
+                break
+
+            time.sleep(options['interval'])
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from django.db import transaction
+
+from decorators       import retry_on_deadlock
+from orders.models    import Bidding, Contract, OrderEvent, Status
+from orders.candles   import record_contract
+from orders.events    import order_event, record_event, record_events
+from orders.orderbook import order_books
+from orders.prices    import biddings_left
+from products.ranking import record_buying_bid
+
+def find_crossing_bidding(bidding):
+    makers = Bidding.objects.select_for_update()\
+                            .filter(product_id=bidding.product_id, status_id=Status.ON_BIDDING, is_seller=not bidding.is_seller)\
+                            .exclude(id=bidding.id)\
+                            .exclude(expired_at__lte=datetime.now())
+
+    if bidding.is_seller:
+        makers = makers.filter(price__gte=bidding.price).order_by('-price', 'created_at', 'id')
+    else:
+        makers = makers.filter(price__lte=bidding.price).order_by('price', 'created_at', 'id')
+
+    return makers.first()
+
+def fill_biddings(maker, taker):
+    taker.price     = maker.price
+    taker.status_id = Status.CONTRACTED
+    maker.status_id = Status.CONTRACTED
+    taker.save(update_fields=['price', 'status', 'updated_at'])
+    maker.save(update_fields=['status', 'updated_at'])
+
+    selling_bid, buying_bid = (maker, taker) if maker.is_seller else (taker, maker)
+
+    contract = Contract.objects.create(
+        selling_bid = selling_bid,
+        buying_bid  = buying_bid
+    )
+
+    record_contract(maker.product_id, selling_bid.price, contract.created_at)
+    record_events([order_event(OrderEvent.FILL, maker, contract), order_event(OrderEvent.FILL, taker, contract)])
+    biddings_left(maker.product_id, maker.is_seller, [maker.price])
+
+    product_id, maker_id = maker.product_id, maker.id
+    transaction.on_commit(lambda: order_books.remove(product_id, maker_id))
+
+    return contract
+
+def match_bidding(bidding):
+    with transaction.atomic():
+        maker = find_crossing_bidding(bidding)
+
+        if maker is None:
+            return None
+
+        return fill_biddings(maker, bidding)
+
+@retry_on_deadlock()
+def take_bidding(user, product_id, maker_id, maker_is_seller):
+    with transaction.atomic():
+        maker = Bidding.objects.select_for_update()\
+                               .select_related('product')\
+                               .filter(id=maker_id, product_id=product_id, status_id=Status.ON_BIDDING, is_seller=maker_is_seller)\
+                               .exclude(expired_at__lte=datetime.now())\
+                               .first()
+
+        if maker is None:
+            return None
+
+        taker = Bidding.objects.create(
+            is_seller  = not maker_is_seller,
+            user       = user,
+            product_id = product_id,
+            price      = maker.price,
+            status_id  = Status.ON_BIDDING
+        )
+        record_event(OrderEvent.BID, taker)
+
+        if not taker.is_seller:
+            record_buying_bid(maker.product.author_id, taker.created_at)
+
+        return fill_biddings(maker, taker)
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_author_bidding_count'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractCandle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(max_length=8)),
+                ('started_at', models.DateTimeField()),
+                ('open', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('high', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('low', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('close', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('volume', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+            options={
+                'db_table': 'contract_candles',
+                'unique_together': {('product', 'resolution', 'started_at')},
+            },
+        ),
+    ]
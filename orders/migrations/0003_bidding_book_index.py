@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_contract_candle'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bidding',
+            index=models.Index(fields=['product', 'status', 'is_seller', 'price', 'created_at'], name='biddings_book_index'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:44
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+
+
+def backfill_expired_at(apps, schema_editor):
+    Bidding       = apps.get_model('orders', 'Bidding')
+    ExpiredWithin = apps.get_model('orders', 'ExpiredWithin')
+
+    for expired_within_id, period in ExpiredWithin.objects.values_list('id', 'period'):
+        Bidding.objects.filter(expired_within_id=expired_within_id, expired_at__isnull=True).update(
+            expired_at=ExpressionWrapper(F('created_at') + timedelta(days=period), output_field=models.DateTimeField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_bidding_book_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bidding',
+            name='expired_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bidding',
+            index=models.Index(fields=['status', 'expired_at'], name='biddings_expiry_index'),
+        ),
+        migrations.RunPython(backfill_expired_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_bidding_expired_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bidding',
+            index=models.Index(fields=['user', 'status', 'updated_at'], name='biddings_history_index'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.5 on 2026-10-18 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_bidding_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=16)),
+                ('bidding_id', models.BigIntegerField()),
+                ('product_id', models.BigIntegerField(null=True)),
+                ('contract_id', models.BigIntegerField(null=True)),
+                ('is_seller', models.BooleanField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'order_events',
+            },
+        ),
+    ]
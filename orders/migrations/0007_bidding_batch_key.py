@@ -0,0 +1,22 @@
+# Generated by Django 3.2.5 on 2026-10-19 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bidding',
+            name='batch_key',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bidding',
+            index=models.Index(fields=['batch_key'], name='biddings_batch_index'),
+        ),
+    ]
@@ -14,9 +14,17 @@ class Bidding(TimeStampModel):
     product        = models.ForeignKey('products.Product', on_delete=models.SET_NULL, null=True)
     price          = models.DecimalField(max_digits=18, decimal_places=2)
     status         = models.ForeignKey('Status', on_delete=models.SET_NULL, null=True) 
+    expired_at     = models.DateTimeField(null=True)
+    batch_key      = models.UUIDField(null=True)
 
     class Meta:
         db_table = 'biddings'
+        indexes  = [
+            models.Index(fields=['product', 'status', 'is_seller', 'price', 'created_at'], name='biddings_book_index'),
+            models.Index(fields=['status', 'expired_at'], name='biddings_expiry_index'),
+            models.Index(fields=['user', 'status', 'updated_at'], name='biddings_history_index'),
+            models.Index(fields=['batch_key'], name='biddings_batch_index'),
+        ]
 
 class Contract(TimeStampModel):
     selling_bid = models.OneToOneField('Bidding', unique=True, related_name='selling_bid', on_delete=models.SET_NULL, null=True)
@@ -39,4 +47,37 @@ class ExpiredWithin(models.Model):
     period = models.IntegerField()
 
     class Meta:
-        db_table = 'expired_within'
\ No newline at end of file
+        db_table = 'expired_within'
+
+class ContractCandle(models.Model):
+    HOURLY = 'hour'
+    DAILY  = 'day'
+
+    product    = models.ForeignKey('products.Product', on_delete=models.CASCADE)
+    resolution = models.CharField(max_length=8)
+    started_at = models.DateTimeField()
+    open       = models.DecimalField(max_digits=18, decimal_places=2)
+    high       = models.DecimalField(max_digits=18, decimal_places=2)
+    low        = models.DecimalField(max_digits=18, decimal_places=2)
+    close      = models.DecimalField(max_digits=18, decimal_places=2)
+    volume     = models.IntegerField(default=0)
+
+    class Meta:
+        db_table        = 'contract_candles'
+        unique_together = ('product', 'resolution', 'started_at')
+
+class OrderEvent(models.Model):
+    BID    = 'bid'
+    FILL   = 'fill'
+    EXPIRE = 'expire'
+
+    event_type  = models.CharField(max_length=16)
+    bidding_id  = models.BigIntegerField()
+    product_id  = models.BigIntegerField(null=True)
+    contract_id = models.BigIntegerField(null=True)
+    is_seller   = models.BooleanField()
+    price       = models.DecimalField(max_digits=18, decimal_places=2)
+    created_at  = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'order_events'
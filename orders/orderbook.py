@@ -0,0 +1,221 @@
+import bisect, threading, time
+from collections import OrderedDict, namedtuple, defaultdict
+from datetime    import datetime
+from decimal     import Decimal
+
+from orders.models import Bidding, Status
+
+Order = namedtuple('Order', ['id', 'product_id', 'is_seller', 'price', 'created_at', 'expired_at'])
+
+def order_from_values(bidding_id, product_id, is_seller, price, created_at, expired_at):
+    return Order(bidding_id, product_id, bool(is_seller), price, created_at, expired_at)
+
+def order_from_bidding(bidding):
+    return order_from_values(bidding.id, bidding.product_id, bidding.is_seller, Decimal(str(bidding.price)), bidding.created_at, bidding.expired_at)
+
+ORDER_FIELDS = ('id', 'product_id', 'is_seller', 'price', 'created_at', 'expired_at')
+
+# other workers take bids, cancels and fills too, and only their own process
+# hears about them, so a book older than this is reloaded from the database.
+ORDER_BOOK_TTL = 5
+
+class PriceLevels:
+    def __init__(self, descending):
+        self.descending = descending
+        self.prices     = []
+        self.levels     = {}
+
+    def add(self, order):
+        level = self.levels.get(order.price)
+
+        if level is None:
+            bisect.insort(self.prices, order.price)
+            level = self.levels[order.price] = OrderedDict()
+
+        level[order.id] = order
+
+    def remove(self, order):
+        level = self.levels.get(order.price)
+
+        if level is None or level.pop(order.id, None) is None:
+            return False
+
+        if not level:
+            del self.levels[order.price]
+            del self.prices[bisect.bisect_left(self.prices, order.price)]
+
+        return True
+
+    def best(self):
+        if not self.prices:
+            return None
+
+        price = self.prices[-1] if self.descending else self.prices[0]
+        return next(iter(self.levels[price].values()))
+
+    def __iter__(self):
+        for price in (self.prices[::-1] if self.descending else self.prices[:]):
+            yield from list(self.levels.get(price, {}).values())
+
+class OrderBook:
+    def __init__(self):
+        self.bids   = PriceLevels(descending=True)
+        self.asks   = PriceLevels(descending=False)
+        self.orders = {}
+
+    def side(self, is_seller):
+        return self.asks if is_seller else self.bids
+
+    def add(self, order):
+        self.remove(order.id)
+        self.orders[order.id] = order
+        self.side(order.is_seller).add(order)
+
+    def remove(self, order_id):
+        order = self.orders.pop(order_id, None)
+
+        if order is not None:
+            self.side(order.is_seller).remove(order)
+
+        return order
+
+    def best(self, is_seller, now=None):
+        now  = now or datetime.now()
+        side = self.side(is_seller)
+
+        while True:
+            order = side.best()
+
+            if order is None or order.expired_at is None or order.expired_at > now:
+                return order
+
+            self.remove(order.id)
+
+    def depth(self, is_seller, limit=None, now=None):
+        now    = now or datetime.now()
+        orders = []
+
+        for order in self.side(is_seller):
+            if order.expired_at is not None and order.expired_at <= now:
+                self.remove(order.id)
+                continue
+
+            orders.append(order)
+            if limit is not None and len(orders) >= limit:
+                break
+
+        return orders
+
+# one book per product held in process memory; books load lazily from open
+# biddings on first access, the write paths keep loaded books in step and a
+# book is reloaded once it is older than the ttl. the scan runs outside the
+# shared lock, one per product at a time; changes made while it runs are
+# replayed on the fresh book before it is swapped in.
+class OrderBooks:
+    def __init__(self, ttl=ORDER_BOOK_TTL, timer=time.monotonic):
+        self.ttl        = ttl
+        self.timer      = timer
+        self.lock       = threading.RLock()
+        self.load_locks = defaultdict(threading.Lock)
+        self.books      = {}
+        self.loaded_at  = {}
+        self.pending    = {}
+
+    def open_biddings(self):
+        return Bidding.objects.filter(status_id=Status.ON_BIDDING)\
+                              .order_by('created_at', 'id')\
+                              .values_list(*ORDER_FIELDS)
+
+    def load(self, product_id):
+        book = OrderBook()
+
+        for values in self.open_biddings().filter(product_id=product_id):
+            book.add(order_from_values(*values))
+
+        return book
+
+    def is_fresh(self, product_id):
+        return product_id in self.books and self.timer() - self.loaded_at[product_id] <= self.ttl
+
+    def get(self, product_id):
+        with self.lock:
+            if self.is_fresh(product_id):
+                return self.books[product_id]
+
+            # a stale book keeps serving while another request reloads it
+            if product_id in self.books and product_id in self.pending:
+                return self.books[product_id]
+
+            load_lock = self.load_locks[product_id]
+
+        with load_lock:
+            with self.lock:
+                if self.is_fresh(product_id):
+                    return self.books[product_id]
+
+                self.pending[product_id] = []
+
+            try:
+                started = self.timer()
+                book    = self.load(product_id)
+            except Exception:
+                with self.lock:
+                    self.pending.pop(product_id, None)
+                raise
+
+            with self.lock:
+                changes = self.pending.pop(product_id, None)
+
+                # discarded while loading, so the scan may predate the change
+                if changes is None:
+                    return book
+
+                for change in changes:
+                    change(book)
+
+                self.books[product_id]     = book
+                self.loaded_at[product_id] = started
+
+                return book
+
+    def top(self, product_id, now=None):
+        book = self.get(product_id)
+
+        with self.lock:
+            return book.best(False, now), book.best(True, now)
+
+    def depth(self, product_id, is_seller, limit=None, now=None):
+        book = self.get(product_id)
+
+        with self.lock:
+            return book.depth(is_seller, limit, now)
+
+    def change(self, product_id, change):
+        with self.lock:
+            if product_id in self.books:
+                change(self.books[product_id])
+
+            if self.pending.get(product_id) is not None:
+                self.pending[product_id].append(change)
+
+    def add(self, order):
+        self.change(order.product_id, lambda book: book.add(order))
+
+    def remove(self, product_id, *order_ids):
+        self.change(product_id, lambda book: [book.remove(order_id) for order_id in order_ids])
+
+    def discard(self, product_id):
+        with self.lock:
+            self.books.pop(product_id, None)
+            self.loaded_at.pop(product_id, None)
+
+            if product_id in self.pending:
+                self.pending[product_id] = None
+
+    def clear(self):
+        with self.lock:
+            self.books     = {}
+            self.loaded_at = {}
+            self.pending   = {product_id: None for product_id in self.pending}
+
+order_books = OrderBooks()
@@ -0,0 +1,35 @@
+from django.db        import transaction
+from django.db.models import Q
+
+from orders.models   import Bidding, Status
+from products.models import Product
+
+# asks set the price a buyer pays right now, bids the price a seller gets.
+# 0 means the side of the book is empty.
+PRICE_COLUMNS = {
+    True : 'current_buying_price',
+    False: 'current_selling_price',
+}
+
+def next_best_price(product_id, is_seller):
+    biddings = Bidding.objects.filter(product_id=product_id, status_id=Status.ON_BIDDING, is_seller=is_seller)\
+                              .order_by('price' if is_seller else '-price')
+
+    return biddings.values_list('price', flat=True).first() or 0
+
+def bidding_entered(product_id, is_seller, price):
+    column = PRICE_COLUMNS[is_seller]
+    better = Q(**{f'{column}__gt': price}) | Q(**{column: 0}) if is_seller else Q(**{f'{column}__lt': price})
+
+    Product.objects.filter(better, id=product_id).update(**{column: price})
+
+def biddings_left(product_id, is_seller, prices):
+    column = PRICE_COLUMNS[is_seller]
+
+    with transaction.atomic():
+        current = Product.objects.select_for_update().filter(id=product_id).values_list(column, flat=True).first()
+
+        if current is None or current not in prices:
+            return
+
+        Product.objects.filter(id=product_id).update(**{column: next_best_price(product_id, is_seller)})
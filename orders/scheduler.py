@@ -0,0 +1,103 @@
+import heapq, time
+from datetime import datetime, timedelta
+
+from django.db.models import Max
+
+from orders.expiry import EXPIRY_CHUNK_SIZE, expire_chunk
+from orders.models import Bidding, Status
+
+# ids are assigned at insert but become visible at commit, so a bid can commit
+# below last_id after the tail has passed it. bids created this recently are
+# re-scanned on every tick to catch them.
+TAIL_WINDOW = timedelta(minutes=1)
+
+# keeps the deadlines of open bids due within the horizon in a heap. new bids
+# are picked up by tailing the id column, and the whole window is reloaded from
+# the (status, expired_at) index when the horizon runs out or after a restart.
+class ExpiryScheduler:
+    def __init__(self, horizon=timedelta(minutes=10), interval=1, tail_window=TAIL_WINDOW):
+        self.horizon      = horizon
+        self.interval     = interval
+        self.tail_window  = tail_window
+        self.heap         = []
+        self.scheduled    = set()
+        self.last_id      = 0
+        self.loaded_until = None
+
+    def load(self, now):
+        self.last_id      = Bidding.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        self.loaded_until = now + self.horizon
+        self.heap         = list(
+            Bidding.objects.filter(status_id=Status.ON_BIDDING, expired_at__lte=self.loaded_until, id__lte=self.last_id)
+                           .values_list('expired_at', 'id')
+        )
+        self.scheduled    = {bidding_id for _, bidding_id in self.heap}
+        heapq.heapify(self.heap)
+
+    def schedule(self, expired_at, bidding_id):
+        if bidding_id not in self.scheduled:
+            self.scheduled.add(bidding_id)
+            heapq.heappush(self.heap, (expired_at, bidding_id))
+
+    def tail(self, now):
+        biddings = Bidding.objects.filter(id__gt=self.last_id)\
+                                  .order_by('id')\
+                                  .values_list('id', 'status_id', 'expired_at')
+
+        for bidding_id, status_id, expired_at in biddings:
+            self.last_id = bidding_id
+
+            if status_id == Status.ON_BIDDING and expired_at is not None and expired_at <= self.loaded_until:
+                self.schedule(expired_at, bidding_id)
+
+        late = Bidding.objects.filter(
+            status_id       = Status.ON_BIDDING,
+            expired_at__lte = self.loaded_until,
+            created_at__gte = now - self.tail_window,
+            id__lte         = self.last_id
+        ).values_list('expired_at', 'id')
+
+        for expired_at, bidding_id in late:
+            self.schedule(expired_at, bidding_id)
+
+    def due(self, now):
+        ids = []
+
+        while self.heap and self.heap[0][0] <= now:
+            ids.append(heapq.heappop(self.heap)[1])
+
+        return ids
+
+    def tick(self, now=None):
+        now = now or datetime.now()
+
+        if self.loaded_until is None or now >= self.loaded_until:
+            self.load(now)
+        else:
+            self.tail(now)
+
+        ids     = self.due(now)
+        expired = 0
+
+        for start in range(0, len(ids), EXPIRY_CHUNK_SIZE):
+            expired += expire_chunk(now, ids=ids[start:start + EXPIRY_CHUNK_SIZE])
+
+        return expired
+
+    def next_wait(self, now=None):
+        now = now or datetime.now()
+
+        if not self.heap:
+            return self.interval
+
+        return max(0, min(self.interval, (self.heap[0][0] - now).total_seconds()))
+
+    def run(self, on_expired=None):
+        while True:
+            now     = datetime.now()
+            expired = self.tick(now)
+
+            if expired and on_expired:
+                on_expired(now, expired)
+
+            time.sleep(self.next_wait())
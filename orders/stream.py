@@ -0,0 +1,62 @@
+import asyncio, re
+
+from asgiref.sync import sync_to_async
+
+from orders.broadcast import broadcaster, tailer, top_of_book, top_message
+
+STREAM_PATH = re.compile(r'^/orders/stream/(?P<product_id>\d+)$')
+HEARTBEAT   = 15
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def stream_product(scope, receive, send, product_id):
+    top = await sync_to_async(top_of_book)(product_id)
+
+    if top is None:
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': b'{"message": "PRODUCT_NOT_FOUND"}'})
+        return
+
+    tailer.ensure_started()
+    queue      = broadcaster.subscribe(product_id)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+
+    try:
+        await send({
+            'type'   : 'http.response.start',
+            'status' : 200,
+            'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')],
+        })
+        await send({'type': 'http.response.body', 'body': top_message(product_id, *top), 'more_body': True})
+
+        while True:
+            getter  = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, disconnect}, timeout=HEARTBEAT, return_when=asyncio.FIRST_COMPLETED)
+
+            if disconnect in done:
+                getter.cancel()
+                break
+
+            if getter in done:
+                body = getter.result()
+            else:
+                getter.cancel()
+                body = b': ping\n\n'
+
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        disconnect.cancel()
+        broadcaster.unsubscribe(product_id, queue)
+
+def stream_application(django_application):
+    async def application(scope, receive, send):
+        match = STREAM_PATH.match(scope['path']) if scope['type'] == 'http' else None
+
+        if match is None:
+            return await django_application(scope, receive, send)
+
+        await stream_product(scope, receive, send, int(match['product_id']))
+
+    return application
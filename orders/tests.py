@@ -1,12 +1,27 @@
-import jwt, json
+import jwt, json, asyncio, threading
 import unittest
+from datetime        import datetime, timedelta
+from decimal         import Decimal
+from io              import StringIO
 
-from django.test     import TestCase, Client
+from django.test     import TestCase, TransactionTestCase, Client, override_settings
+from django.core.management import call_command
+from django.db       import connection
+from django.test.utils import CaptureQueriesContext
+from unittest.mock   import patch
 
 from django.db.models import Q
 from users.models     import User
 from products.models  import Product, Author, ProductImage, Size, Theme, Size, ProductColor, ProductTheme, Color, ProductColor
-from orders.models    import Bidding, Contract, ExpiredWithin, Status
+from orders.models    import Bidding, Contract, ContractCandle, ExpiredWithin, OrderEvent, Status
+from orders.candles   import record_contract
+from orders.expiry    import expire_biddings
+from orders.events    import read_events
+from orders.scheduler import ExpiryScheduler
+from orders.broadcast import Broadcaster, OrderEventTailer
+from orders.stream    import stream_application
+from orders.orderbook import OrderBook, OrderBooks, Order, order_books
+from pagination      import encode_cursor
 from gream_settings   import SECRET_KEY, ALGORITHMS
 
 class BiddingTest(TestCase):
@@ -162,6 +177,165 @@ class BiddingTest(TestCase):
                 'message': 'NEW_BID_CREATED'
             }
         )
+        self.assertEqual(Author.objects.get(id=1).bidding_count, 1)
+        self.assertIsNotNone(Bidding.objects.get(product_id=3).expired_at)
+
+    def test_bidding_post_matches_crossing_bid(self):
+        client = Client()
+
+        data = {
+            "product_id"       : 1,
+            "expired_within_id": 1,
+            "price"            : 35000
+        }
+
+        response = client.post('/orders/bidding?type=buy', json.dumps(data), content_type='application/json', **headers)
+        contract = Contract.objects.get(selling_bid_id=1)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'message': 'CONTRACT_SUCCESS'})
+        self.assertEqual(contract.buying_bid.price, 30000)
+        self.assertEqual(contract.buying_bid.status_id, Status.CONTRACTED)
+        self.assertEqual(contract.selling_bid.status_id, Status.CONTRACTED)
+        self.assertEqual(Product.objects.get(id=1).current_buying_price, 0)
+        self.assertEqual(
+            list(OrderEvent.objects.order_by('id').values_list('event_type', 'bidding_id', 'contract_id')),
+            [
+                (OrderEvent.BID, contract.buying_bid_id, None),
+                (OrderEvent.FILL, 1, contract.id),
+                (OrderEvent.FILL, contract.buying_bid_id, contract.id)
+            ]
+        )
+
+    def test_bidding_post_keeps_non_crossing_bid_open(self):
+        client = Client()
+
+        data = {
+            "product_id"       : 2,
+            "expired_within_id": 1,
+            "price"            : 120000
+        }
+
+        response = client.post('/orders/bidding?type=sell', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'message': 'NEW_BID_CREATED'})
+        self.assertFalse(Contract.objects.exists())
+        self.assertEqual(Product.objects.get(id=2).current_buying_price, 120000)
+
+    def test_bidding_post_best_price_falls_back_to_next_bid(self):
+        client = Client()
+
+        Bidding.objects.create(is_seller=1, user_id=1, product_id=1, price=32000, status_id=1, expired_within_id=1)
+
+        data = {
+            "product_id"       : 1,
+            "expired_within_id": 1,
+            "price"            : 30000
+        }
+
+        client.post('/orders/bidding?type=buy', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(Product.objects.get(id=1).current_buying_price, 32000)
+
+    def test_check_best_prices_reports_and_fixes_drift(self):
+        Product.objects.filter(id=2).update(current_selling_price=90000)
+        out = StringIO()
+
+        call_command('check_best_prices', '--fix', stdout=out)
+
+        self.assertIn('1 products drifted', out.getvalue())
+        self.assertEqual(Product.objects.get(id=2).current_selling_price, 110000)
+
+    def test_bulk_bidding_post_reports_each_item(self):
+        client = Client()
+
+        data = {
+            "biddings": [
+                {"product_id": 3, "type": "sell", "price": 70000, "expired_within_id": 1},
+                {"product_id": 3, "type": "sell", "price": 65000, "expired_within_id": 1},
+                {"product_id": 1, "type": "buy", "price": 35000, "expired_within_id": 1},
+                {"product_id": 99, "type": "buy", "price": 35000, "expired_within_id": 1},
+                {"product_id": 2, "type": "hold", "price": 35000, "expired_within_id": 1},
+                {"product_id": 2, "type": "sell"}
+            ]
+        }
+
+        response = client.post('/orders/bidding/bulk', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['message'] for result in response.json()['results']], [
+            'NEW_BID_CREATED',
+            'NEW_BID_CREATED',
+            'CONTRACT_SUCCESS',
+            'PRODUCT_NOT_FOUND',
+            'INVALID_TYPE',
+            'KEY_ERROR'
+        ])
+        self.assertEqual(Bidding.objects.filter(product_id=3, status_id=Status.ON_BIDDING).count(), 2)
+        self.assertEqual(Contract.objects.get().selling_bid_id, 1)
+        self.assertEqual(Product.objects.get(id=3).current_buying_price, 65000)
+        self.assertEqual(
+            set(OrderEvent.objects.filter(event_type=OrderEvent.BID, product_id=3).values_list('bidding_id', flat=True)),
+            set(Bidding.objects.filter(product_id=3).values_list('id', flat=True))
+        )
+        self.assertEqual(Product.objects.get(id=1).current_buying_price, 0)
+
+    def test_bulk_bidding_post_without_returned_ids(self):
+        client = Client()
+
+        data = {
+            "biddings": [
+                {"product_id": 3, "type": "sell", "price": 70000, "expired_within_id": 1},
+                {"product_id": 3, "type": "sell", "price": 65000, "expired_within_id": 1}
+            ]
+        }
+
+        with patch.object(connection.features, 'can_return_rows_from_bulk_insert', False), \
+             CaptureQueriesContext(connection) as queries:
+            response = client.post('/orders/bidding/bulk', json.dumps(data), content_type='application/json', **headers)
+
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "biddings"')]
+        created = Bidding.objects.filter(product_id=3)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            sorted(OrderEvent.objects.filter(event_type=OrderEvent.BID, product_id=3).values_list('bidding_id', flat=True)),
+            sorted(created.values_list('id', flat=True))
+        )
+        self.assertEqual(len(set(created.values_list('batch_key', flat=True))), 1)
+
+    def test_bulk_bidding_post_rejects_invalid_items(self):
+        client = Client()
+
+        data = {
+            "biddings": [
+                ["product_id", 3],
+                {"product_id": 3, "type": "sell", "price": "70000.005", "expired_within_id": 1},
+                {"product_id": 3, "type": "sell", "price": "1e16", "expired_within_id": 1},
+                {"product_id": 3, "type": "sell", "price": "70000.50", "expired_within_id": 1}
+            ]
+        }
+
+        response = client.post('/orders/bidding/bulk', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['message'] for result in response.json()['results']], [
+            'INVALID_BIDDING',
+            'INVALID_PRICE',
+            'INVALID_PRICE',
+            'NEW_BID_CREATED'
+        ])
+
+    def test_bulk_bidding_post_invalid_body(self):
+        client = Client()
+
+        for body in ['[]', '"biddings"', '{"biddings": ']:
+            response = client.post('/orders/bidding/bulk', body, content_type='application/json', **headers)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'message': 'INVALID_BIDDINGS'})
 
     def test_bidding_post_product_not_found(self):
         client = Client()
@@ -181,6 +355,40 @@ class BiddingTest(TestCase):
             }
         )
 
+    def test_bidding_post_invalid_price(self):
+        client = Client()
+
+        for price in ["abc", 70.129, -1, None]:
+            data = {
+                "product_id"       : 3,
+                "expired_within_id": 1,
+                "price"            : price
+            }
+
+            response = client.post('/orders/bidding?type=buy', json.dumps(data), content_type='application/json', **headers)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'message': 'INVALID_PRICE'})
+
+        self.assertFalse(Bidding.objects.filter(product_id=3).exists())
+
+    def test_bidding_post_books_stored_price(self):
+        client = Client()
+        order_books.clear()
+        order_books.get(3)
+
+        data = {
+            "product_id"       : 3,
+            "expired_within_id": 1,
+            "price"            : "70.1"
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/orders/bidding?type=buy', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(order_books.top(3)[0].price, Bidding.objects.get(product_id=3).price)
+        self.assertEqual(str(order_books.top(3)[0].price), '70.10')
+
     def test_bidding_post_invalid_type(self):
         client = Client()
 
@@ -353,6 +561,23 @@ class ContractTest(TestCase):
             }
         )
 
+    def test_contract_post_bid_already_taken(self):
+        client = Client()
+
+        data = {
+            "product_id"    : 1,
+            "selling_bid_id": 1,
+            "buying_bid_id" : None
+        }
+
+        client.post('/orders/contract?type=buy', json.dumps(data), content_type='application/json', **headers)
+        response = client.post('/orders/contract?type=buy', json.dumps(data), content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'message': 'SELLING_BID_NOT_FOUND'})
+        self.assertEqual(Contract.objects.count(), 1)
+        self.assertEqual(Bidding.objects.filter(is_seller=False, product_id=1).count(), 1)
+
     def test_contract_post_invalid_type(self):
         client = Client()
 
@@ -601,56 +826,519 @@ class BuyingTest(TestCase):
         ProductImage.objects.all().delete()
         Status.objects.all().delete()
 
+    def setUp(self):
+        Bidding.objects.update(updated_at="2021-07-27 10:00:00", expired_at="2021-09-25 10:00:00")
+        Bidding.objects.create(
+            id             = 5,
+            is_seller      = 1,
+            price          = "9000000.00",
+            expired_within = ExpiredWithin.objects.get(id=5),
+            product_id     = 2,
+            status_id      = 3,
+            user_id        = 94
+        )
+        Bidding.objects.filter(id=5).update(updated_at="2021-07-28 10:00:00", expired_at="2021-09-26 10:00:00")
+
     def test_biddinghistory_get_success(self):
-        client = Client()
+        client  = Client()
+        headers = {'HTTP_AUTHORIZATION': jwt.encode({"user_id" : 94}, SECRET_KEY, ALGORITHMS)}
         biddinglist = [
             {
-            "product_id": 1,
-            "product_name": "Topsy Emerie Quinten Maddison Poster",
-            "is_seller": False,
-            "image": "https://images.unsplash.com/photo-1597873618537-64a04f9e1fb3?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=MnwxMjA3fDB8MXxzZWFyY2h8Mnx8cG9zdGVyfHwwfDJ8fHwxNjI2Njg4OTQ0&ixlib=rb-1.2.1&q=80&w=1080",
+            "product_id": 2,
+            "product_name": "Lynnette Kimberlyn Jonah Webster poster",
+            "is_seller": True,
+            "image": "https://images.unsplash.com/photo-1600164318544-79e55da1ac8f?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=MnwxMjA3fDB8MXxzZWFyY2h8M3x8cG9zdGVyfHwwfDJ8fHwxNjI2Njg4OTQ0&ixlib=rb-1.2.1&q=80&w=1080",
             "status_id": 3,
             "status_name": "체결 완료",
-            "price": "7440000.00",
-            "bidding_date": "2021.07.27",
-            "expired_date": "2021.09.25"
+            "price": "9000000.00",
+            "bidding_date": "2021.07.28",
+            "expired_date": "2021.09.26"
         },
         {
             "product_id": 1,
             "product_name": "Topsy Emerie Quinten Maddison Poster",
-            "is_seller": True,
+            "is_seller": False,
             "image": "https://images.unsplash.com/photo-1597873618537-64a04f9e1fb3?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=MnwxMjA3fDB8MXxzZWFyY2h8Mnx8cG9zdGVyfHwwfDJ8fHwxNjI2Njg4OTQ0&ixlib=rb-1.2.1&q=80&w=1080",
             "status_id": 3,
             "status_name": "체결 완료",
             "price": "7440000.00",
             "bidding_date": "2021.07.27",
             "expired_date": "2021.09.25"
-        },
-        {
-            "product_id": 2,
-            "product_name": "Lynnette Kimberlyn Jonah Webster poster",
-            "is_seller": False,
-            "image": "https://images.unsplash.com/photo-1600164318544-79e55da1ac8f?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=MnwxMjA3fDB8MXxzZWFyY2h8M3x8cG9zdGVyfHwwfDJ8fHwxNjI2Njg4OTQ0&ixlib=rb-1.2.1&q=80&w=1080",
-            "status_id": 3,
-            "status_name": "체결 완료",
-            "price": "8828000.00",
-            "bidding_date": "2021.07.27",
-            "expired_date": "2021.09.25"
-        },
-        {
-            "product_id": 2,
-            "product_name": "Lynnette Kimberlyn Jonah Webster poster",
-            "is_seller": True,
-            "image": "https://images.unsplash.com/photo-1600164318544-79e55da1ac8f?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=MnwxMjA3fDB8MXxzZWFyY2h8M3x8cG9zdGVyfHwwfDJ8fHwxNjI2Njg4OTQ0&ixlib=rb-1.2.1&q=80&w=1080",
-            "status_id": 3,
-            "status_name": "체결 완료",
-            "price": "8828000.00",
-            "bidding_date": "2021.07.27",
-            "expired_date": "2021.09.25"
         }
     ]
  
-        response = client.get('/orders/bidding')
+        response = client.get('/orders/bidding/history', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"results": biddinglist, "next_cursor": None})
+
+    def test_biddinghistory_get_cursor_pages(self):
+        client  = Client()
+        headers = {'HTTP_AUTHORIZATION': jwt.encode({"user_id" : 94}, SECRET_KEY, ALGORITHMS)}
+
+        first  = client.get('/orders/bidding/history?limit=1', **headers).json()
+        second = client.get(f'/orders/bidding/history?limit=1&cursor={first["next_cursor"]}', **headers).json()
+
+        self.assertEqual([bidding['price'] for bidding in first['results']], ['9000000.00'])
+        self.assertEqual([bidding['price'] for bidding in second['results']], ['7440000.00'])
+
+    def test_biddinghistory_get_invalid_cursor(self):
+        client  = Client()
+        headers = {'HTTP_AUTHORIZATION': jwt.encode({"user_id" : 94}, SECRET_KEY, ALGORITHMS)}
+
+        response = client.get('/orders/bidding/history?cursor=broken', **headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message': 'INVALID_CURSOR'})
+
+        for values in [["2026-01-01T00:00:00", "abc"], ["2026-01-01T00:00:00", None], ["yesterday", 1]]:
+            response = client.get('/orders/bidding/history', {'cursor': encode_cursor(values)}, **headers)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'message': 'INVALID_CURSOR'})
+
+    def test_biddinghistory_get_limit(self):
+        client  = Client()
+        headers = {'HTTP_AUTHORIZATION': jwt.encode({"user_id" : 94}, SECRET_KEY, ALGORITHMS)}
+
+        for limit in [0, -1]:
+            response = client.get(f'/orders/bidding/history?limit={limit}', **headers)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 1)
+
+        response = client.get('/orders/bidding/history?limit=ten', **headers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message': 'INVALID_LIMIT'})
+
+class BiddingHistoryQueryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(id=1, email='history@gmail.com')
+        Status.objects.create(id=1, name='입찰중')
+
+        for product_id in range(1, 11):
+            Product.objects.create(
+                id                    = product_id,
+                name                  = f'poster {product_id}',
+                current_buying_price  = 0,
+                current_selling_price = 0,
+                original_price        = 20000
+            )
+            ProductImage.objects.create(product_id=product_id, image_url=f'image_{product_id}')
+
+    def assert_history_queries(self, count):
+        Bidding.objects.bulk_create([
+            Bidding(is_seller=index % 2, user_id=1, product_id=index % 10 + 1, price=10000 + index, status_id=1)
+            for index in range(count)
+        ])
+        client  = Client()
+        headers = {'HTTP_AUTHORIZATION': jwt.encode({"user_id" : 1}, SECRET_KEY, ALGORITHMS)}
+
+        client.get('/orders/bidding/history?limit=1', **headers)
+
+        with self.assertNumQueries(2):
+            response = client.get(f'/orders/bidding/history?limit={count}', **headers)
+
+        self.assertEqual(len(response.json()['results']), count)
+
+    def test_history_queries_with_10_rows(self):
+        self.assert_history_queries(10)
+
+    def test_history_queries_with_1000_rows(self):
+        self.assert_history_queries(1000)
+
+class ContractCandleTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(
+            id                    = 1,
+            name                  = 'wow poster',
+            current_buying_price  = 0,
+            current_selling_price = 0,
+            original_price        = 20000
+        )
+
+    def test_record_contract_rolls_up_prices(self):
+        now = datetime.now().replace(minute=30)
+
+        for price in [30000, 45000, 20000, 25000]:
+            record_contract(1, Decimal(price), now)
+
+        hourly = ContractCandle.objects.get(product_id=1, resolution=ContractCandle.HOURLY)
+        daily  = ContractCandle.objects.get(product_id=1, resolution=ContractCandle.DAILY)
+
+        for candle in [hourly, daily]:
+            self.assertEqual(
+                (candle.open, candle.high, candle.low, candle.close, candle.volume),
+                (30000, 45000, 20000, 25000, 4)
+            )
+
+    def test_product_chart_get(self):
+        client = Client()
+        now    = datetime.now()
+
+        record_contract(1, Decimal(30000), now - timedelta(days=2))
+        record_contract(1, Decimal(40000), now)
+        record_contract(1, Decimal(50000), now - timedelta(days=40))
+
+        response = client.get('/products/1/chart?range=1m')
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"results":biddinglist})
\ No newline at end of file
+        self.assertEqual([candle['close'] for candle in response.json()['results']], ['30000.00', '40000.00'])
+
+    def test_product_chart_get_invalid_range(self):
+        client   = Client()
+        response = client.get('/products/1/chart?range=10y')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'message': 'INVALID_RANGE'})
+
+class BiddingExpiryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(
+            id                    = 1,
+            name                  = 'wow poster',
+            current_buying_price  = 20000,
+            current_selling_price = 0,
+            original_price        = 20000
+        )
+
+        Status.objects.create(id=1, name='입찰중')
+        Status.objects.create(id=2, name='기한 만료')
+
+    def test_update_bidding_status_catches_up_overdue_biddings(self):
+        now = datetime.now()
+
+        Bidding.objects.create(id=1, is_seller=1, product_id=1, price=20000, status_id=1, expired_at=now - timedelta(days=3))
+        Bidding.objects.create(id=2, is_seller=1, product_id=1, price=25000, status_id=1, expired_at=now - timedelta(minutes=1))
+        Bidding.objects.create(id=3, is_seller=1, product_id=1, price=30000, status_id=1, expired_at=now + timedelta(days=1))
+        Bidding.objects.create(id=4, is_seller=1, product_id=1, price=35000, status_id=1)
+
+        self.assertEqual(expire_biddings(now, chunk_size=1)[0], 2)
+        self.assertEqual(expire_biddings(now)[0], 0)
+        self.assertEqual(list(OrderEvent.objects.filter(event_type=OrderEvent.EXPIRE).values_list('bidding_id', flat=True)), [1, 2])
+        self.assertEqual(list(Bidding.objects.filter(status_id=Status.EXPIRED).order_by('id').values_list('id', flat=True)), [1, 2])
+        self.assertEqual(Product.objects.get(id=1).current_buying_price, 30000)
+
+@override_settings(INTERNAL_API_TOKEN='internal-secret')
+class OrderEventTest(TestCase):
+    def setUp(self):
+        for bidding_id in range(1, 6):
+            OrderEvent.objects.create(event_type=OrderEvent.BID, bidding_id=bidding_id, product_id=1, is_seller=True, price=10000)
+
+        self.first_id = OrderEvent.objects.order_by('id').first().id
+        OrderEvent.objects.update(created_at=datetime.now() - timedelta(minutes=2))
+
+    def test_read_events_pages_by_cursor(self):
+        first, after, gaps = read_events(self.first_id - 1, 3)
+        second, _, _       = read_events(after, 3, gaps)
+
+        self.assertEqual([event['bidding_id'] for event in first], [1, 2, 3])
+        self.assertEqual([event['bidding_id'] for event in second], [4, 5])
+
+    def test_read_events_reads_past_gaps_and_picks_up_late_commits(self):
+        missing = OrderEvent.objects.create(event_type=OrderEvent.BID, bidding_id=6, product_id=1, is_seller=True, price=10000)
+        OrderEvent.objects.create(event_type=OrderEvent.BID, bidding_id=7, product_id=1, is_seller=True, price=10000)
+
+        # bidding 6's transaction has not committed yet
+        missing_id = missing.id
+        missing.delete()
+
+        events, after, gaps = read_events(self.first_id + 4)
+
+        self.assertEqual([event['bidding_id'] for event in events], [7])
+        self.assertEqual(list(gaps), [missing_id])
+
+        OrderEvent.objects.create(id=missing_id, event_type=OrderEvent.BID, bidding_id=6, product_id=1, is_seller=True, price=10000)
+        events, after, gaps = read_events(after, gaps=gaps)
+
+        self.assertEqual([event['bidding_id'] for event in events], [6])
+        self.assertEqual(gaps, {})
+
+    def test_read_events_gives_up_on_old_gaps(self):
+        missing = OrderEvent.objects.create(event_type=OrderEvent.BID, bidding_id=6, product_id=1, is_seller=True, price=10000)
+        OrderEvent.objects.create(event_type=OrderEvent.BID, bidding_id=7, product_id=1, is_seller=True, price=10000)
+        missing.delete()
+
+        _, _, gaps = read_events(self.first_id + 4, now=datetime.now() + timedelta(minutes=2))
+
+        self.assertEqual(gaps, {})
+
+    def test_order_event_get(self):
+        client   = Client()
+        headers  = {'HTTP_X_INTERNAL_TOKEN': 'internal-secret'}
+        response = client.get(f'/internal/orders/events?limit=2&cursor={self.first_id - 1}', **headers)
+        cursor   = response.json()['next_cursor']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['bidding_id'] for event in response.json()['results']], [1, 2])
+        self.assertEqual(
+            [event['bidding_id'] for event in client.get(f'/internal/orders/events?cursor={cursor}', **headers).json()['results']],
+            [3, 4, 5]
+        )
+
+    def test_order_event_get_invalid_cursor(self):
+        client  = Client()
+        headers = {'HTTP_X_INTERNAL_TOKEN': 'internal-secret'}
+
+        for cursor in ['broken', encode_cursor(['1', []]), encode_cursor([1, [['x', 'y']]])]:
+            response = client.get(f'/internal/orders/events?cursor={cursor}', **headers)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'message': 'INVALID_CURSOR'})
+
+    def test_order_event_get_limit(self):
+        client  = Client()
+        headers = {'HTTP_X_INTERNAL_TOKEN': 'internal-secret'}
+
+        self.assertEqual(len(client.get('/internal/orders/events?limit=-1', **headers).json()['results']), 1)
+        self.assertEqual(client.get('/internal/orders/events?limit=many', **headers).json(), {'message': 'INVALID_LIMIT'})
+
+    def test_order_event_get_internal_only(self):
+        client = Client()
+
+        self.assertEqual(client.get('/internal/orders/events').status_code, 403)
+        self.assertEqual(client.get('/internal/orders/events', HTTP_X_INTERNAL_TOKEN='guess').status_code, 403)
+        self.assertEqual(client.get('/orders/events', HTTP_X_INTERNAL_TOKEN='internal-secret').status_code, 404)
+
+class BroadcastTest(TestCase):
+    def test_publish_fans_out_and_drops_oldest_for_slow_subscribers(self):
+        async def fan_out():
+            broadcaster = Broadcaster(queue_size=2)
+            queues      = [broadcaster.subscribe(1) for _ in range(3)]
+            other       = broadcaster.subscribe(2)
+
+            for message in [b'a', b'b', b'c']:
+                self.assertEqual(broadcaster.publish(1, message), 3)
+
+            broadcaster.unsubscribe(2, other)
+
+            return [[queue.get_nowait() for _ in range(queue.qsize())] for queue in queues], dict(broadcaster.subscribers)
+
+        received, subscribers = asyncio.run(fan_out())
+
+        self.assertEqual(received, [[b'b', b'c']] * 3)
+        self.assertEqual(list(subscribers), [1])
+
+    def test_tailer_turns_events_into_top_and_contract_messages(self):
+        Product.objects.create(id=1, name='wow poster', current_buying_price=30000, current_selling_price=20000, original_price=20000)
+        tailer = OrderEventTailer(Broadcaster())
+
+        self.assertEqual(tailer.poll({1}), (0, []))
+
+        for bidding_id in [1, 2]:
+            OrderEvent.objects.create(event_type=OrderEvent.FILL, bidding_id=bidding_id, product_id=1, contract_id=7, is_seller=bidding_id == 1, price=30000)
+        OrderEvent.objects.create(event_type=OrderEvent.BID, bidding_id=3, product_id=2, is_seller=True, price=10000)
+        OrderEvent.objects.update(created_at=datetime.now() - timedelta(minutes=1))
+
+        read, messages = tailer.poll({1})
+
+        self.assertEqual(read, 3)
+        self.assertEqual([(product_id, message.split(b'\n')[0]) for product_id, message in messages], [
+            (1, b'event: contract'),
+            (1, b'event: top')
+        ])
+        self.assertIn(b'"best_ask": "30000.00"', messages[1][1])
+
+    def test_tailer_prints_contracts_committed_out_of_order(self):
+        Product.objects.create(id=1, name='wow poster', current_buying_price=30000, current_selling_price=20000, original_price=20000)
+        tailer = OrderEventTailer(Broadcaster())
+        tailer.poll({1})
+
+        for contract_id in [8, 7, 8]:
+            OrderEvent.objects.create(event_type=OrderEvent.FILL, bidding_id=contract_id, product_id=1, contract_id=contract_id, is_seller=True, price=30000)
+
+        _, messages = tailer.poll({1})
+
+        self.assertEqual([message for _, message in messages].count(messages[0][1]), 1)
+        self.assertEqual([message.split(b'\n')[0] for _, message in messages].count(b'event: contract'), 2)
+
+    def test_tailer_stops_without_subscribers(self):
+        broadcaster = Broadcaster()
+        tailer      = OrderEventTailer(broadcaster, interval=0)
+        tailer.after = 5
+        tailer.poll  = lambda product_ids: (0, [])
+
+        async def run():
+            queue = broadcaster.subscribe(1)
+            task  = asyncio.ensure_future(tailer.run())
+
+            await asyncio.sleep(0.05)
+            self.assertFalse(task.done())
+
+            broadcaster.unsubscribe(1, queue)
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(run())
+
+        self.assertIsNone(tailer.after)
+
+class StreamTest(TransactionTestCase):
+    def test_stream_sends_top_of_book_snapshot(self):
+        Product.objects.create(id=1, name='wow poster', current_buying_price=30000, current_selling_price=20000, original_price=20000)
+
+        async def stream(path):
+            sent = []
+
+            async def receive():
+                while len(sent) < 2:
+                    await asyncio.sleep(0.01)
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+
+            await stream_application(None)({'type': 'http', 'path': path}, receive, send)
+            return sent
+
+        sent    = asyncio.run(stream('/orders/stream/1'))
+        missing = asyncio.run(stream('/orders/stream/2'))
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertTrue(sent[1]['body'].startswith(b'event: top'))
+        self.assertEqual(missing[0]['status'], 404)
+
+class ExpirySchedulerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(
+            id                    = 1,
+            name                  = 'wow poster',
+            current_buying_price  = 20000,
+            current_selling_price = 0,
+            original_price        = 20000
+        )
+
+        Status.objects.create(id=1, name='입찰중')
+        Status.objects.create(id=2, name='기한 만료')
+
+    def test_tick_expires_loaded_and_tailed_biddings(self):
+        now       = datetime.now()
+        scheduler = ExpiryScheduler(horizon=timedelta(minutes=10))
+
+        Bidding.objects.create(id=1, is_seller=1, product_id=1, price=20000, status_id=1, expired_at=now - timedelta(days=1))
+        Bidding.objects.create(id=2, is_seller=1, product_id=1, price=25000, status_id=1, expired_at=now + timedelta(minutes=30))
+
+        self.assertEqual(scheduler.tick(now), 1)
+        self.assertEqual(scheduler.heap, [])
+
+        Bidding.objects.create(id=3, is_seller=1, product_id=1, price=30000, status_id=1, expired_at=now + timedelta(seconds=5))
+
+        self.assertEqual(scheduler.tick(now + timedelta(seconds=1)), 0)
+        self.assertEqual(len(scheduler.heap), 1)
+        self.assertEqual(scheduler.tick(now + timedelta(seconds=6)), 1)
+        self.assertEqual(scheduler.tick(now + timedelta(minutes=31)), 1)
+        self.assertFalse(Bidding.objects.filter(status_id=Status.ON_BIDDING).exists())
+        self.assertEqual(Product.objects.get(id=1).current_buying_price, 0)
+
+    def test_tick_picks_up_late_commits_below_last_id(self):
+        now       = datetime.now()
+        scheduler = ExpiryScheduler(horizon=timedelta(minutes=10))
+
+        Bidding.objects.create(id=5, is_seller=1, product_id=1, price=25000, status_id=1, expired_at=now + timedelta(minutes=30))
+        scheduler.tick(now)
+
+        # id 4 was assigned before id 5 but its transaction committed after the tail passed it
+        Bidding.objects.create(id=4, is_seller=1, product_id=1, price=30000, status_id=1, expired_at=now + timedelta(seconds=5))
+
+        self.assertEqual(scheduler.tick(now + timedelta(seconds=1)), 0)
+        self.assertEqual(scheduler.heap, [(now + timedelta(seconds=5), 4)])
+        self.assertEqual(scheduler.tick(now + timedelta(seconds=6)), 1)
+        self.assertEqual(scheduler.heap, [])
+
+class OrderBookTest(TestCase):
+    def test_best_follows_price_time_priority(self):
+        book = OrderBook()
+        now  = datetime.now()
+
+        book.add(Order(1, 1, True, Decimal(30000), now - timedelta(minutes=3), None))
+        book.add(Order(2, 1, True, Decimal(20000), now - timedelta(minutes=2), None))
+        book.add(Order(3, 1, True, Decimal(20000), now - timedelta(minutes=1), None))
+        book.add(Order(4, 1, False, Decimal(10000), now - timedelta(minutes=2), None))
+        book.add(Order(5, 1, False, Decimal(15000), now - timedelta(minutes=1), None))
+
+        self.assertEqual(book.best(True).id, 2)
+        self.assertEqual(book.best(False).id, 5)
+        self.assertEqual([order.id for order in book.depth(True)], [2, 3, 1])
+
+        book.remove(2)
+
+        self.assertEqual(book.best(True).id, 3)
+
+    def test_best_skips_expired_orders(self):
+        book = OrderBook()
+        now  = datetime.now()
+
+        book.add(Order(1, 1, True, Decimal(20000), now - timedelta(days=2), now - timedelta(days=1)))
+        book.add(Order(2, 1, True, Decimal(30000), now - timedelta(days=2), now + timedelta(days=1)))
+
+        self.assertEqual(book.best(True, now).id, 2)
+        self.assertNotIn(1, book.orders)
+
+class OrderBooksTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(
+            id                    = 1,
+            name                  = 'wow poster',
+            current_buying_price  = 0,
+            current_selling_price = 20000,
+            original_price        = 20000
+        )
+
+        Status.objects.create(id=1, name='입찰중')
+        Status.objects.create(id=2, name='기한 만료')
+
+        Bidding.objects.create(id=1, is_seller=1, product_id=1, price=20000, status_id=1)
+
+    def test_stale_book_reloads_after_ttl(self):
+        clock = [0]
+        books = OrderBooks(ttl=5, timer=lambda: clock[0])
+
+        self.assertEqual(books.top(1)[1].id, 1)
+
+        # another worker's write, which this process never hears about
+        Bidding.objects.filter(id=1).update(status_id=2)
+        Bidding.objects.create(id=2, is_seller=1, product_id=1, price=25000, status_id=1)
+
+        clock[0] = 5
+        self.assertEqual(books.top(1)[1].id, 1)
+
+        clock[0] = 6
+        self.assertEqual(books.top(1)[1].id, 2)
+
+    def test_load_runs_outside_the_lock_and_replays_changes(self):
+        books = OrderBooks()
+        load  = books.load
+        now   = datetime.now()
+
+        def racing_load(product_id):
+            book = load(product_id)
+
+            # another request thread gets the lock and adds a bid mid-scan
+            writer = threading.Thread(target=lambda: books.add(Order(2, 1, True, Decimal(15000), now, None)))
+            writer.start()
+            writer.join(timeout=1)
+
+            self.assertFalse(writer.is_alive())
+            return book
+
+        with patch.object(books, 'load', racing_load):
+            self.assertEqual(books.top(1)[1].id, 2)
+
+    def test_discard_while_loading_drops_the_scan(self):
+        books = OrderBooks()
+        load  = books.load
+
+        def racing_load(product_id):
+            book = load(product_id)
+            books.discard(product_id)
+            return book
+
+        with patch.object(books, 'load', racing_load):
+            self.assertEqual(books.top(1)[1].id, 1)
+
+        self.assertNotIn(1, books.books)
@@ -1,9 +1,10 @@
 from django.urls import path
 
-from orders.views import BiddingView, ContractView, BiddinghistoryView
+from orders.views import BiddingView, BulkBiddingView, ContractView, BiddinghistoryView
 
 urlpatterns = [
     path('/bidding', BiddingView.as_view()),
-    path('/contract', ContractView.as_view()),
-    path('/bidding', BiddinghistoryView.as_view())
+    path('/bidding/bulk', BulkBiddingView.as_view()),
+    path('/bidding/history', BiddinghistoryView.as_view()),
+    path('/contract', ContractView.as_view())
 ]
@@ -1,20 +1,41 @@
 import json
-
-from django.utils import timezone
+from datetime import datetime
+from decimal  import Decimal, InvalidOperation
 
 from django.http.response import JsonResponse
 
+from django.db        import transaction
 from django.db.models import Q
-from products.models import Product
-from orders.models import Bidding, Contract, Status
+from products.models import Product, ProductImage
+from orders.models import Bidding, ExpiredWithin, OrderEvent, Status
+from orders.events import record_event, read_events, encode_event_cursor, decode_event_cursor
+from orders.expiry import expires_at
 from orders.response import orders_schema_dict
+from orders.orderbook import order_books, order_from_bidding
+from orders.matching import match_bidding, take_bidding
+from orders.bulk import MAX_BULK_BIDDINGS, clean_price, submit_biddings
+from orders.prices import bidding_entered
+from products.ranking import record_buying_bid
 
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 
-from utils import authorization
+from utils import authorization, internal_only
+from pagination import encode_cursor, decode_cursor, parse_limit, keyset_ordering, keyset_filter
 from decorators import query_debugger
 
+HISTORY_FIELDS = (
+    'id',
+    'product_id',
+    'product__name',
+    'is_seller',
+    'status_id',
+    'status__name',
+    'price',
+    'updated_at',
+    'expired_at',
+)
+
 class BiddingView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = orders_schema_dict)
     @authorization
@@ -25,7 +46,9 @@ class BiddingView(APIView):
 
             product_id = data['product_id']
 
-            if not Product.objects.filter(id=product_id).exists():
+            product = Product.objects.filter(id=product_id).values('author_id').first()
+
+            if product is None:
                 return JsonResponse({'message': 'PRODUCT_NOT_FOUND'}, status=404)
 
             contract_type = request.GET.get('type', None)
@@ -33,30 +56,78 @@ class BiddingView(APIView):
             if contract_type not in ['buy', 'sell']:
                 return JsonResponse({'message': 'INVALID_TYPE'}, status=400)
 
-            bidding = Bidding.objects.create(
-                expired_within_id = data['expired_within_id'],
-                is_seller         = False if contract_type =='buy' else True,
-                user              = user,
-                product_id        = product_id,
-                price             = data['price'],
-                status_id         = Status.ON_BIDDING
-            )
+            period = ExpiredWithin.objects.filter(id=data['expired_within_id']).values_list('period', flat=True).first()
+
+            if period is None:
+                return JsonResponse({'message': 'EXPIRED_WITHIN_NOT_FOUND'}, status=404)
+
+            # the book and the matcher see the price as the column stores it
+            try:
+                price = clean_price(Decimal(str(data['price'])))
+            except InvalidOperation:
+                price = None
+
+            if price is None:
+                return JsonResponse({'message': 'INVALID_PRICE'}, status=400)
+
+            with transaction.atomic():
+                bidding = Bidding.objects.create(
+                    expired_within_id = data['expired_within_id'],
+                    expired_at        = expires_at(period),
+                    is_seller         = False if contract_type =='buy' else True,
+                    user              = user,
+                    product_id        = product_id,
+                    price             = price,
+                    status_id         = Status.ON_BIDDING
+                )
+                record_event(OrderEvent.BID, bidding)
 
-            product = Product.objects.get(id=product_id)
+                if contract_type == 'buy':
+                    record_buying_bid(product['author_id'], bidding.created_at)
 
-            if contract_type == 'buy' and bidding.price > product.current_selling_price:
-                product.current_selling_price = bidding.price
+                if match_bidding(bidding):
+                    return JsonResponse({'message': 'CONTRACT_SUCCESS'}, status=201)
 
-            if contract_type == 'sell' and bidding.price < product.current_buying_price:
-                product.current_buying_price = bidding.price
-            
-            product.save()
+                order = order_from_bidding(bidding)
+                transaction.on_commit(lambda: order_books.add(order))
+                bidding_entered(product_id, bidding.is_seller, bidding.price)
 
             return JsonResponse({'message': 'NEW_BID_CREATED'}, status=201)
         
         except KeyError:
             return JsonResponse({'message': 'KEY_ERROR'}, status=400)
 
+class BulkBiddingView(APIView):
+    @swagger_auto_schema(manual_parameters = [], responses = orders_schema_dict)
+    @authorization
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+
+            if not isinstance(data, dict):
+                return JsonResponse({'message': 'INVALID_BIDDINGS'}, status=400)
+
+            items = data['biddings']
+
+            if not isinstance(items, list) or not items:
+                return JsonResponse({'message': 'INVALID_BIDDINGS'}, status=400)
+
+            if len(items) > MAX_BULK_BIDDINGS:
+                return JsonResponse({'message': 'TOO_MANY_BIDDINGS'}, status=400)
+
+            results = submit_biddings(request.user, items)
+
+            return JsonResponse({
+                'message': 'SUCCESS',
+                'results': [{'index': index, 'message': message} for index, message in enumerate(results)]
+            }, status=201)
+
+        except KeyError:
+            return JsonResponse({'message': 'KEY_ERROR'}, status=400)
+
+        except ValueError:
+            return JsonResponse({'message': 'INVALID_BIDDINGS'}, status=400)
+
 class ContractView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = orders_schema_dict)
     @authorization
@@ -75,42 +146,16 @@ class ContractView(APIView):
             buying_bid_id  = data['buying_bid_id']
 
             if contract_type == 'buy':
-                if not Bidding.objects.filter(id=selling_bid_id, status_id=Status.ON_BIDDING, is_seller=True, product_id=product_id).exists():
+                contract = take_bidding(user, product_id, selling_bid_id, maker_is_seller=True)
+
+                if not contract:
                     return JsonResponse({'message': 'SELLING_BID_NOT_FOUND'}, status=404)
-                
-                selling_bid = Bidding.objects.get(id=selling_bid_id)
-
-                buying_bid  = Bidding.objects.create(
-                    is_seller  = False,
-                    user       = user,
-                    product_id = product_id,
-                    price      = selling_bid.price,
-                    status     = Status.ON_BIDDING
-                )
 
             if contract_type == 'sell':
-                if not Bidding.objects.filter(id=buying_bid_id, status_id=Status.ON_BIDDING, is_seller=False, product_id=product_id).exists():
-                    return JsonResponse({'message': 'BUYING_BID_NOT_FOUND'}, status=404)
-                
-                buying_bid = Bidding.objects.get(id=buying_bid_id)
-
-                selling_bid  = Bidding.objects.create(
-                    is_seller  = True,
-                    user       = user,
-                    product_id = product_id,
-                    price      = buying_bid.price,
-                    status     = Status.ON_BIDDING
-                )
+                contract = take_bidding(user, product_id, buying_bid_id, maker_is_seller=False)
 
-            Contract.objects.create(
-                selling_bid = selling_bid,
-                buying_bid  = buying_bid
-            )
-
-            buying_bid.status_id  = Status.CONTRACTED
-            selling_bid.status_id = Status.CONTRACTED
-            buying_bid.save()
-            selling_bid.save()
+                if not contract:
+                    return JsonResponse({'message': 'BUYING_BID_NOT_FOUND'}, status=404)
 
             return JsonResponse({'message': 'CONTRACT_SUCCESS'}, status=201)
 
@@ -119,33 +164,81 @@ class ContractView(APIView):
 
 class BiddinghistoryView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = orders_schema_dict)
-    @authorization
+    @authorization(claims_only=True)
     @query_debugger
     def get(self, request):
         status_id = request.GET.get("status_id", None)
-        offset    = int(request.GET.get("offset", 0))
-        limit     = int(request.GET.get("limit", 100))
-        offset    = offset * limit
-        limit     = offset + limit
+        cursor    = request.GET.get("cursor", None)
+
+        try:
+            limit = parse_limit(request.GET.get("limit"), 100, 1000)
+        except ValueError:
+            return JsonResponse({'message': 'INVALID_LIMIT'}, status=400)
         
-        q = Q()
+        q = Q(user_id=request.user_id)
 
         if status_id:
             q &= Q(status_id=status_id)
+
+        if cursor:
+            try:
+                last_updated_at, last_id = decode_cursor(cursor, 2)
+
+                if not isinstance(last_id, int):
+                    raise ValueError('INVALID_CURSOR')
+
+                q &= keyset_filter('-updated_at', datetime.fromisoformat(last_updated_at), last_id)
+            except (ValueError, TypeError):
+                return JsonResponse({'message': 'INVALID_CURSOR'}, status=400)
          
-        biddings = Bidding.objects.select_related('product', 'status').filter(q)[offset:limit]
+        biddings = list(
+            Bidding.objects.filter(q)
+                           .order_by(*keyset_ordering('-updated_at'))
+                           .values(*HISTORY_FIELDS)[:limit]
+        )
+
+        images = {}
+        if biddings:
+            product_images = ProductImage.objects.filter(product_id__in={bidding['product_id'] for bidding in biddings})\
+                                                 .order_by('-id')\
+                                                 .values_list('product_id', 'image_url')
+            images = dict(product_images)
 
         biddinglist = [
             {
-                "product_id"    : bidding.product.id,
-                "product_name"  : bidding.product.name,
-                "is_seller"     : bidding.is_seller,
-                "image"         : bidding.product.productimage_set.first().image_url,
-                "status_id"     : bidding.status.id,
-                "status_name"   : bidding.status.name,
-                "price"         : bidding.price,
-                "bidding_date"  : bidding.updated_at.strftime("%Y.%m.%d"),
-                "expired_date"  : (bidding.updated_at + timezone.timedelta(days=bidding.expired_within.period)).strftime("%Y.%m.%d"),
+                "product_id"    : bidding['product_id'],
+                "product_name"  : bidding['product__name'],
+                "is_seller"     : bidding['is_seller'],
+                "image"         : images.get(bidding['product_id']),
+                "status_id"     : bidding['status_id'],
+                "status_name"   : bidding['status__name'],
+                "price"         : bidding['price'],
+                "bidding_date"  : bidding['updated_at'].strftime("%Y.%m.%d"),
+                "expired_date"  : bidding['expired_at'].strftime("%Y.%m.%d") if bidding['expired_at'] else None,
             } for bidding in biddings
         ]
-        return JsonResponse({"results": biddinglist}, status = 200)
\ No newline at end of file
+
+        next_cursor = None
+        if len(biddings) == limit:
+            next_cursor = encode_cursor([biddings[-1]['updated_at'].isoformat(), biddings[-1]['id']])
+
+        return JsonResponse({"results": biddinglist, "next_cursor": next_cursor}, status = 200)
+
+class OrderEventView(APIView):
+    @swagger_auto_schema(auto_schema = None)
+    @internal_only
+    @query_debugger
+    def get(self, request):
+        try:
+            after, gaps = decode_event_cursor(request.GET.get("cursor", "0"))
+        except (ValueError, TypeError):
+            return JsonResponse({'message': 'INVALID_CURSOR'}, status=400)
+
+        try:
+            limit = parse_limit(request.GET.get("limit"), 1000, 5000)
+        except ValueError:
+            return JsonResponse({'message': 'INVALID_LIMIT'}, status=400)
+
+        events, after, gaps = read_events(after, limit, gaps)
+
+        return JsonResponse({"results": events, "next_cursor": encode_event_cursor(after, gaps)}, status = 200)
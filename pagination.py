@@ -0,0 +1,32 @@
+import json, base64
+
+from django.db.models import Q
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode('utf-8')
+
+def decode_cursor(cursor, size):
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')))
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('INVALID_CURSOR')
+
+    return values
+
+def parse_limit(value, default, maximum):
+    if value is None:
+        return default
+
+    return max(1, min(int(value), maximum))
+
+def keyset_ordering(order_field):
+    return (order_field, '-id') if order_field.startswith('-') else (order_field, 'id')
+
+# written as col >= v and (col > v or id > x) rather than col > v or (col = v
+# and id > x): the leading range on col lets mysql seek the (col, id) index
+# instead of merging two scans.
+def keyset_filter(order_field, value, last_id):
+    field  = order_field.lstrip('-')
+    lookup = 'lt' if order_field.startswith('-') else 'gt'
+
+    return Q(**{f'{field}__{lookup}e': value}) & (Q(**{f'{field}__{lookup}': value}) | Q(**{f'id__{lookup}': last_id}))
@@ -0,0 +1,44 @@
+import json, hashlib
+
+from django.core.cache import cache
+
+from products.models import Author, Theme, Color, Size
+
+CATEGORY_CACHE_KEY     = 'products:category'
+CATEGORY_CACHE_TIMEOUT = 60 * 60
+
+def build_category_results():
+    categories = [
+        ("author", "작가", Author),
+        ("theme",  "테마", Theme),
+        ("color",  "색상", Color),
+        ("size",   "크기", Size),
+    ]
+    return [
+        {
+            "category_name"   : category_name,
+            "category_name_kr": category_name_kr,
+            "option"          : [
+                {
+                    "name": name,
+                    "id"  : option_id
+                } for option_id, name in model.objects.order_by('id').values_list('id', 'name')
+            ]
+        } for category_name, category_name_kr, model in categories
+    ]
+
+def get_category_payload():
+    payload = cache.get(CATEGORY_CACHE_KEY)
+
+    if payload is None:
+        body    = json.dumps({"results": build_category_results()}).encode('utf-8')
+        payload = {
+            "body": body,
+            "etag": '"%s"' % hashlib.md5(body).hexdigest()
+        }
+        cache.set(CATEGORY_CACHE_KEY, payload, CATEGORY_CACHE_TIMEOUT)
+
+    return payload
+
+def invalidate_category_payload():
+    cache.delete(CATEGORY_CACHE_KEY)
@@ -0,0 +1,4 @@
+from products.ranking import prune_author_bidding_counts
+
+def prune_author_ranking():
+    print(prune_author_bidding_counts())
@@ -0,0 +1,281 @@
+import threading, time
+from collections import Counter, defaultdict
+
+from django.db        import close_old_connections
+from django.db.models import Q
+
+from products.models import Product, ProductTheme, ProductColor
+
+FACETS = ('author', 'theme', 'color', 'size')
+
+# writes from other processes, queryset.update() and bulk_create() never reach
+# the signal receivers, so the index is rebuilt in the background this often.
+FACET_INDEX_TTL = 60
+
+# past this many matches the page query joins the facet tables instead of
+# shipping an id__in list as large as the catalog.
+FACET_ID_LIMIT = 1000
+
+FACET_LOOKUPS = {
+    'author': 'author_id__in',
+    'theme' : 'theme__in',
+    'color' : 'color__in',
+    'size'  : 'size_id__in',
+}
+
+STATE = ('bitsets', 'all_bits', 'products', 'rows', 'refs')
+
+def count_bits(bits):
+    return bin(bits).count('1')
+
+def parse_facet_filters(query):
+    return {facet: [int(value_id) for value_id in query.getlist(facet)] for facet in FACETS}
+
+def facet_filter(filters):
+    q = Q()
+
+    for facet, value_ids in filters.items():
+        if value_ids:
+            q &= Q(**{FACET_LOOKUPS[facet]: value_ids})
+
+    return q
+
+def bit_ids(bits):
+    digits = bin(bits)[:1:-1]
+    ids    = []
+    index  = digits.find('1')
+
+    while index != -1:
+        ids.append(index)
+        index = digits.find('1', index + 1)
+
+    return ids
+
+# bit n of a value's bitset is set when product n carries that value.
+# values in a facet are OR-ed, facets are AND-ed, same as the SQL filter.
+class FacetIndex:
+    def __init__(self, ttl=FACET_INDEX_TTL):
+        self.ttl   = ttl
+        self.lock  = threading.RLock()
+        self.ready = threading.Condition(self.lock)
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.reset()
+            self.is_built   = False
+            self.built_at   = None
+            self.pending    = None
+            self.refreshing = False
+
+    def reset(self):
+        self.bitsets  = {facet: defaultdict(int) for facet in FACETS}
+        self.all_bits = 0
+        self.products = {}
+        self.rows     = {'theme': {}, 'color': {}}
+        self.refs     = {'theme': Counter(), 'color': Counter()}
+
+    def load(self):
+        self.reset()
+
+        for product_id, author_id, size_id in Product.objects.values_list('id', 'author_id', 'size_id'):
+            self._set_product(product_id, author_id, size_id)
+
+        for row_id, theme_id, product_id in ProductTheme.objects.values_list('id', 'theme_id', 'product_id'):
+            self._set_row('theme', row_id, theme_id, product_id)
+
+        for row_id, color_id, product_id in ProductColor.objects.values_list('id', 'color_id', 'product_id'):
+            self._set_row('color', row_id, color_id, product_id)
+
+    # the scan runs without the lock; changes signalled meanwhile are queued
+    # and replayed on the new state, which is safe because every change is
+    # idempotent.
+    def build(self):
+        with self.lock:
+            self.pending = []
+
+        fresh = FacetIndex(self.ttl)
+
+        try:
+            fresh.load()
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+
+        with self.lock:
+            for name in STATE:
+                setattr(self, name, getattr(fresh, name))
+
+            pending, self.pending = self.pending, None
+
+            for method, args in pending:
+                method(*args)
+
+            self.is_built = True
+            self.built_at = time.monotonic()
+
+    def refresh(self):
+        try:
+            self.build()
+        finally:
+            with self.lock:
+                self.refreshing = False
+                self.ready.notify_all()
+
+    def refresh_in_thread(self):
+        try:
+            self.refresh()
+        finally:
+            close_old_connections()
+
+    def refresh_async(self):
+        with self.lock:
+            if self.refreshing:
+                return
+
+            self.refreshing = True
+
+        threading.Thread(target=self.refresh_in_thread, daemon=True).start()
+
+    # concurrent first requests on a cold index wait for one build instead of
+    # each running their own; a stale index keeps serving while it refreshes.
+    def ensure_built(self):
+        with self.lock:
+            while not self.is_built and self.refreshing:
+                self.ready.wait()
+
+            is_cold  = not self.is_built
+            is_stale = not is_cold and time.monotonic() - self.built_at > self.ttl
+
+            if is_cold:
+                self.refreshing = True
+
+        if is_cold:
+            self.refresh()
+        elif is_stale:
+            self.refresh_async()
+
+    def match(self, filters):
+        self.ensure_built()
+
+        with self.lock:
+            return self._match(filters)
+
+    def facet_counts(self, filters):
+        self.ensure_built()
+
+        with self.lock:
+            counts = {}
+
+            for facet in FACETS:
+                others        = {other: value_ids for other, value_ids in filters.items() if other != facet}
+                bits          = self._match(others)
+                counts[facet] = {
+                    value_id: count_bits(bits & value_bits)
+                    for value_id, value_bits in sorted(self.bitsets[facet].items())
+                }
+
+            return counts
+
+    def set_product(self, product_id, author_id, size_id):
+        self.apply(self._set_product, product_id, author_id, size_id)
+
+    def remove_product(self, product_id):
+        self.apply(self._remove_product, product_id)
+
+    def set_row(self, facet, row_id, value_id, product_id):
+        self.apply(self._replace_row, facet, row_id, value_id, product_id)
+
+    def remove_row(self, facet, row_id):
+        self.apply(self._remove_row, facet, row_id)
+
+    def remove_value(self, facet, value_id):
+        self.apply(self._remove_value, facet, value_id)
+
+    def apply(self, method, *args):
+        with self.lock:
+            if self.is_built:
+                method(*args)
+
+            if self.pending is not None:
+                self.pending.append((method, args))
+
+    def _match(self, filters):
+        bits = self.all_bits
+
+        for facet, value_ids in filters.items():
+            if not value_ids:
+                continue
+
+            facet_bits = 0
+            for value_id in value_ids:
+                facet_bits |= self.bitsets[facet].get(value_id, 0)
+            bits &= facet_bits
+
+        return bits
+
+    def _set_product(self, product_id, author_id, size_id):
+        bit = 1 << product_id
+
+        for facet, value_id in zip(('author', 'size'), self.products.get(product_id, (None, None))):
+            self._clear_bit(facet, value_id, bit)
+
+        for facet, value_id in (('author', author_id), ('size', size_id)):
+            if value_id is not None:
+                self.bitsets[facet][value_id] |= bit
+
+        self.products[product_id] = (author_id, size_id)
+        self.all_bits            |= bit
+
+    def _remove_product(self, product_id):
+        if product_id not in self.products:
+            return
+
+        bit = 1 << product_id
+
+        for facet, value_id in zip(('author', 'size'), self.products.pop(product_id)):
+            self._clear_bit(facet, value_id, bit)
+        self.all_bits &= ~bit
+
+    def _set_row(self, facet, row_id, value_id, product_id):
+        self.rows[facet][row_id] = (value_id, product_id)
+
+        if value_id is not None:
+            self.refs[facet][(value_id, product_id)] += 1
+            self.bitsets[facet][value_id]            |= 1 << product_id
+
+    def _replace_row(self, facet, row_id, value_id, product_id):
+        self._remove_row(facet, row_id)
+        self._set_row(facet, row_id, value_id, product_id)
+
+    def _remove_row(self, facet, row_id):
+        value_id, product_id = self.rows[facet].pop(row_id, (None, None))
+
+        if value_id is None:
+            return
+
+        key = (value_id, product_id)
+        self.refs[facet][key] -= 1
+
+        if self.refs[facet][key] <= 0:
+            del self.refs[facet][key]
+            self._clear_bit(facet, value_id, 1 << product_id)
+
+    def _remove_value(self, facet, value_id):
+        self.bitsets[facet].pop(value_id, None)
+
+        if facet in self.rows:
+            for row_id in [row_id for row_id, (row_value_id, _) in self.rows[facet].items() if row_value_id == value_id]:
+                self._remove_row(facet, row_id)
+        else:
+            index = 0 if facet == 'author' else 1
+            for product_id, values in self.products.items():
+                if values[index] == value_id:
+                    self.products[product_id] = values[:index] + (None,) + values[index + 1:]
+
+    def _clear_bit(self, facet, value_id, bit):
+        if value_id in self.bitsets[facet]:
+            self.bitsets[facet][value_id] &= ~bit
+
+facet_index = FacetIndex()
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db                   import transaction
+from django.db.models            import Count
+from django.db.models.functions  import TruncHour
+
+from orders.models   import Bidding
+from products.models import Author, AuthorBiddingCount
+from products.ranking import RANKING_WINDOWS, truncate_hour
+
+class Command(BaseCommand):
+    help = 'Backfill the best author ranking counters from the biddings table'
+
+    def handle(self, *args, **options):
+        since        = truncate_hour(datetime.now() - max(delta for delta in RANKING_WINDOWS.values() if delta))
+        buy_biddings = Bidding.objects.filter(is_seller=False, product__author__isnull=False)
+
+        totals = dict(
+            buy_biddings.values_list('product__author_id')
+                        .annotate(total=Count('id'))
+                        .order_by()
+        )
+        hourly = buy_biddings.filter(created_at__gt=since)\
+                             .annotate(hour=TruncHour('created_at'))\
+                             .values_list('product__author_id', 'hour')\
+                             .annotate(total=Count('id'))\
+                             .order_by()
+
+        with transaction.atomic():
+            authors = list(Author.objects.select_for_update().only('id', 'bidding_count'))
+            for author in authors:
+                author.bidding_count = totals.get(author.id, 0)
+            Author.objects.bulk_update(authors, ['bidding_count'], batch_size=1000)
+
+            AuthorBiddingCount.objects.all().delete()
+            AuthorBiddingCount.objects.bulk_create([
+                AuthorBiddingCount(author_id=author_id, hour=hour, count=total) for author_id, hour, total in hourly
+            ], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ranking for {len(authors)} authors'))
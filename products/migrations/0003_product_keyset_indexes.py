@@ -0,0 +1,25 @@
+# Generated by Django 3.2.5 on 2026-10-19 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_author_bidding_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['original_price', 'id'], name='products_original_index'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['current_buying_price', 'id'], name='products_buying_index'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['current_selling_price', 'id'], name='products_selling_index'),
+        ),
+    ]
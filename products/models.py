@@ -11,6 +11,12 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'products'
+        indexes  = [
+            models.Index(fields=['original_price', 'id'], name='products_original_index'),
+            models.Index(fields=['current_buying_price', 'id'], name='products_buying_index'),
+            models.Index(fields=['current_selling_price', 'id'], name='products_selling_index'),
+        ]
+
 class ProductTheme(models.Model):
     theme   = models.ForeignKey('Theme', on_delete=models.SET_NULL, null=True)
     product = models.ForeignKey('Product', on_delete=models.CASCADE)
@@ -49,11 +55,21 @@ class ProductImage(models.Model):
         db_table = 'product_images'
 
 class Author(models.Model):
-    name = models.CharField(max_length=45)
+    name          = models.CharField(max_length=45)
+    bidding_count = models.IntegerField(default=0, db_index=True)
 
     class Meta:
         db_table = 'authors'
 
+class AuthorBiddingCount(models.Model):
+    author = models.ForeignKey('Author', on_delete=models.CASCADE)
+    hour   = models.DateTimeField(db_index=True)
+    count  = models.IntegerField(default=0)
+
+    class Meta:
+        db_table        = 'author_bidding_counts'
+        unique_together = ('author', 'hour')
+
 class Size(models.Model):
     name = models.CharField(max_length=45)
 
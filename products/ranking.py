@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from django.db        import transaction, IntegrityError
+from django.db.models import F, Sum
+
+from products.models import Author, AuthorBiddingCount
+
+RANKING_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d' : timedelta(days=7),
+    'all': None,
+}
+
+def truncate_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def record_buying_bid(author_id, created_at, count=1):
+    if author_id is None:
+        return
+
+    hour = truncate_hour(created_at)
+
+    Author.objects.filter(id=author_id).update(bidding_count=F('bidding_count') + count)
+
+    if AuthorBiddingCount.objects.filter(author_id=author_id, hour=hour).update(count=F('count') + count):
+        return
+
+    try:
+        with transaction.atomic():
+            AuthorBiddingCount.objects.create(author_id=author_id, hour=hour, count=count)
+    except IntegrityError:
+        AuthorBiddingCount.objects.filter(author_id=author_id, hour=hour).update(count=F('count') + count)
+
+def get_best_authors(window, limit, now=None):
+    if RANKING_WINDOWS[window] is None:
+        return list(Author.objects.order_by('-bidding_count', 'id').values_list('id', 'name')[:limit])
+
+    since = truncate_hour((now or datetime.now()) - RANKING_WINDOWS[window])
+
+    return list(
+        AuthorBiddingCount.objects.filter(hour__gt=since)
+                                  .values_list('author_id', 'author__name')
+                                  .annotate(total=Sum('count'))
+                                  .order_by('-total', 'author_id')[:limit]
+    )
+
+def prune_author_bidding_counts(now=None):
+    since = truncate_hour((now or datetime.now()) - max(delta for delta in RANKING_WINDOWS.values() if delta))
+
+    return AuthorBiddingCount.objects.filter(hour__lte=since).delete()[0]
@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from products.models import ProductImage
+
+CARD_FIELDS = (
+    'id',
+    'name',
+    'author_id',
+    'author__name',
+    'current_buying_price',
+    'current_selling_price',
+    'original_price',
+)
+
+def serialize_product_cards(products, sort):
+    rows   = list(products.values(*CARD_FIELDS))
+    images = defaultdict(list)
+
+    if rows:
+        product_images = ProductImage.objects.filter(product_id__in=[row['id'] for row in rows])\
+                                             .order_by('id')\
+                                             .values_list('product_id', 'image_url')
+
+        for product_id, image_url in product_images:
+            images[product_id].append(image_url)
+
+    return [
+        {
+            "author_id"     : row['author_id'],
+            "product_id"    : row['id'],
+            "product_name"  : row['name'],
+            "product_price" : row['current_buying_price'] if sort == "buying-price-ascending" else\
+                                (row['current_selling_price'] if sort == "selling-price-descending" else row['original_price']),
+            "sort_name"     : "즉시 구매가순" if sort == "buying-price-ascending" else\
+                                ("즉시 판매가순" if sort == "selling-price-descending" else "발매가순"),
+            "author_name"   : row['author__name'],
+            "image"         : images[row['id']],
+        } for row in rows
+    ]
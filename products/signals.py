@@ -0,0 +1,56 @@
+from django.db                import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from products.models import Product, ProductTheme, ProductColor, Author, Theme, Color, Size
+from products.facets import facet_index
+from products.categories import invalidate_category_payload
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    values = (instance.id, instance.author_id, instance.size_id)
+    transaction.on_commit(lambda: facet_index.set_product(*values))
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    product_id = instance.id
+    transaction.on_commit(lambda: facet_index.remove_product(product_id))
+
+@receiver(post_save, sender=ProductTheme)
+def index_product_theme(sender, instance, **kwargs):
+    values = ('theme', instance.id, instance.theme_id, instance.product_id)
+    transaction.on_commit(lambda: facet_index.set_row(*values))
+
+@receiver(post_delete, sender=ProductTheme)
+def unindex_product_theme(sender, instance, **kwargs):
+    row_id = instance.id
+    transaction.on_commit(lambda: facet_index.remove_row('theme', row_id))
+
+@receiver(post_save, sender=ProductColor)
+def index_product_color(sender, instance, **kwargs):
+    values = ('color', instance.id, instance.color_id, instance.product_id)
+    transaction.on_commit(lambda: facet_index.set_row(*values))
+
+@receiver(post_delete, sender=ProductColor)
+def unindex_product_color(sender, instance, **kwargs):
+    row_id = instance.id
+    transaction.on_commit(lambda: facet_index.remove_row('color', row_id))
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Theme)
+@receiver(post_delete, sender=Color)
+@receiver(post_delete, sender=Size)
+def unindex_facet_value(sender, instance, **kwargs):
+    facet, value_id = sender.__name__.lower(), instance.id
+    transaction.on_commit(lambda: facet_index.remove_value(facet, value_id))
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Theme)
+@receiver(post_save, sender=Color)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Theme)
+@receiver(post_delete, sender=Color)
+@receiver(post_delete, sender=Size)
+def refresh_category(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_category_payload)
@@ -1,18 +1,26 @@
-import json, jwt
+import json, jwt, threading, time
 import unittest
+from unittest import mock
+from io import StringIO
 
 from django.test      import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command
 from django.db.models import Q
 from django.utils     import timezone
 from datetime         import datetime
 
 from products.models  import Product, Author, ProductImage, Size, Color, Theme, ProductTheme, ProductColor
+from products.facets  import FacetIndex, facet_index
 from orders.models    import ExpiredWithin, Bidding, Contract, Status
+from orders.orderbook import order_books
 from users.models     import User
+from pagination       import encode_cursor
 from gream.settings   import SECRET_KEY, ALGORITHMS
 
 class CategoryTest(TestCase):
     def setUp(self):
+        cache.clear()
         Author.objects.create(
             name = "Bianka Anastazija",
             id   = 1
@@ -38,32 +46,36 @@ class CategoryTest(TestCase):
         client  = Client()
         results = [
             {
-                "category_name": "작가",
-                "option"       : [
+                "category_name"   : "author",
+                "category_name_kr": "작가",
+                "option"          : [
                     {
                         "name": "Bianka Anastazija",
                         "id"  : 1
                     } 
                 ]},
             {
-                "category_name": "테마",
-                "option"       : [
+                "category_name"   : "theme",
+                "category_name_kr": "테마",
+                "option"          : [
                     {
                         "name": "팝아트",
                         "id"  : 2
                     }
                 ]},
             {
-                "category_name": "색상",
-                "option"       : [
+                "category_name"   : "color",
+                "category_name_kr": "색상",
+                "option"          : [
                     {
                         "name": "Red",
                         "id"  : 1
                     }
                 ]},
             {
-                "category_name": "크기",
-                "option"       : [
+                "category_name"   : "size",
+                "category_name_kr": "크기",
+                "option"          : [
                     {
                         "name": "3",
                         "id"  : 3
@@ -73,6 +85,30 @@ class CategoryTest(TestCase):
         response = client.get('/products/category')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"results":results})
+
+    def test_categoryview_get_not_modified(self):
+        client   = Client()
+        response = client.get('/products/category')
+        etag     = response['ETag']
+
+        # the cache lookup is the only query; the categories are not rebuilt
+        with self.assertNumQueries(1):
+            response = client.get('/products/category', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_categoryview_get_invalidated_on_change(self):
+        client = Client()
+        etag   = client.get('/products/category')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Size.objects.create(name = "4", id = 4)
+
+        response = client.get('/products/category', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][3]["option"][-1], {"name": "4", "id": 4})
 class ProductTest(TestCase):
     def setUpTestData():
         Author.objects.create(
@@ -201,6 +237,8 @@ class ProductTest(TestCase):
             theme_id   = 3,
             product_id = 3
         )
+    def setUp(self):
+        facet_index.clear()
     def tearDown(self):
         Author.objects.all().delete()
         Theme.objects.all().delete()
@@ -237,9 +275,139 @@ class ProductTest(TestCase):
                 "image"                     : ["https://images.unsplash.com/photo-1580981454083-eca7032db2c3?crop=entropy&cs=tinysrgb&fit=max&fm=jpg&ixid=MnwxMjA3fDB8MXxzZWFyY2h8NHx8cG9zdGVyfHwwfDJ8fHwxNjI2Njg4OTQ0&ixlib=rb-1.2.1&q=80&w=1080"]
             }
         ]
-        response = client.get('/products')
+        response = client.get('/products?sort=selling-price-descending')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"product_count": 3, "results":productlist})
+
+    def test_productview_get_cursor_pages(self):
+        client   = Client()
+        response = client.get('/products?cursor=&limit=2')
+        first    = response.json()
+
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"results":productlist})
+        self.assertEqual([product["product_id"] for product in first["results"]], [3, 2])
+        self.assertIsNotNone(first["next_cursor"])
+
+        response = client.get('/products', {"cursor": first["next_cursor"], "limit": 2})
+        second   = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product["product_id"] for product in second["results"]], [1])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_productview_get_filtered(self):
+        client   = Client()
+        response = client.get('/products?theme=2&theme=6&color=2&color=3')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["product_count"], 1)
+        self.assertEqual([product["product_id"] for product in response.json()["results"]], [2])
+
+    def test_productview_get_filter_follows_updates(self):
+        client = Client()
+        client.get('/products')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductColor.objects.create(product_id = 3, color_id = 2)
+            Product.objects.filter(id=1).first().delete()
+
+        response = client.get('/products?color=1&color=2')
+
+        self.assertEqual(response.json()["product_count"], 2)
+        self.assertEqual([product["product_id"] for product in response.json()["results"]], [3, 2])
+
+    def test_productview_get_filtered_large_match_uses_sql(self):
+        client = Client()
+
+        with mock.patch('products.views.FACET_ID_LIMIT', 0):
+            response = client.get('/products?theme=2&theme=6&color=2&color=3')
+
+        self.assertEqual(response.json()["product_count"], 1)
+        self.assertEqual([product["product_id"] for product in response.json()["results"]], [2])
+
+    def test_productview_get_stale_index_rebuilds(self):
+        client = Client()
+        client.get('/products')
+
+        ProductColor.objects.bulk_create([ProductColor(product_id = 3, color_id = 2)])
+        facet_index.built_at -= facet_index.ttl + 1
+
+        with mock.patch.object(facet_index, 'refresh_async', side_effect=facet_index.refresh) as refresh:
+            client.get('/products?color=2')
+        response = client.get('/products?color=2')
+
+        refresh.assert_called_once()
+        self.assertEqual([product["product_id"] for product in response.json()["results"]], [3, 2])
+
+    def test_cold_index_builds_once_for_concurrent_requests(self):
+        index = FacetIndex()
+        loads = []
+
+        def slow_load(fresh):
+            fresh.reset()
+            loads.append(fresh)
+            time.sleep(0.1)
+
+        with mock.patch.object(FacetIndex, 'load', slow_load):
+            threads = [threading.Thread(target=method, args=({},)) for method in [index.match, index.facet_counts] * 2]
+
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(loads), 1)
+        self.assertTrue(index.is_built)
+        self.assertFalse(index.refreshing)
+
+    def test_facetview_get_counts(self):
+        client   = Client()
+        response = client.get('/products/facets?color=1&size=3&size=4')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "product_count": 1,
+            "results"      : [
+                {
+                    "category_name": "author",
+                    "option"       : [{"id": 1, "count": 1}, {"id": 2, "count": 0}, {"id": 3, "count": 0}]
+                },
+                {
+                    "category_name": "theme",
+                    "option"       : [{"id": 2, "count": 1}, {"id": 3, "count": 0}, {"id": 6, "count": 0}]
+                },
+                {
+                    "category_name": "color",
+                    "option"       : [{"id": 1, "count": 1}, {"id": 2, "count": 1}, {"id": 3, "count": 0}]
+                },
+                {
+                    "category_name": "size",
+                    "option"       : [{"id": 1, "count": 0}, {"id": 3, "count": 1}, {"id": 4, "count": 0}]
+                }
+            ]
+        })
+
+    def test_productview_get_invalid_cursor(self):
+        client   = Client()
+        response = client.get('/products?cursor=invalid')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"message": "INVALID_CURSOR"})
+
+    def test_productview_get_invalid_cursor_values(self):
+        client = Client()
+
+        for values in [["original-price-ascending", "xx", 1], ["original-price-ascending", None, 1], ["original-price-ascending", "20000", "abc"]]:
+            response = client.get('/products', {"cursor": encode_cursor(values)})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"message": "INVALID_CURSOR"})
+
+    def test_productview_get_invalid_limit(self):
+        client = Client()
+
+        self.assertEqual(len(client.get('/products?limit=-1').json()["results"]), 1)
+        self.assertEqual(client.get('/products?limit=many').json(), {"message": "INVALID_LIMIT"})
 
 class ProductDetailTest(TestCase):
     @classmethod
@@ -393,6 +561,9 @@ class ProductDetailTest(TestCase):
             buying_bid  = buying_bidding2
         )
 
+    def setUp(self):
+        order_books.clear()
+
     def test_product_detail_get_success(self):
         client   = Client()
         response = client.get('/products/1')
@@ -400,23 +571,21 @@ class ProductDetailTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {
             "message": "SUCCESS",
-            "main_info": [
-                {
-                    "name": "멋진그림",
-                    "recent_price": "2000.00",
-                    "oldest_selling_bidding_id": 1,
-                    "oldest_buying_bidding_id": 2,
-                    "current_selling_price": "2000.00",
-                    "current_buyling_price": "2000.00",
-                    "image_url": [
-                        "test_url1",
-                        "test_url2",
-                        "test_url3"
-                    ],
-                    "comparing_price": "0.00",
-                    "comparing_price_ratio": "0.0"
-                }
-            ],
+            "main_info": {
+                "name": "멋진그림",
+                "recent_price": "2000.00",
+                "oldest_selling_bidding_id": 1,
+                "oldest_buying_bidding_id": 2,
+                "current_selling_price": "2000.00",
+                "current_buying_price": "2000.00",
+                "image_url": [
+                    "test_url1",
+                    "test_url2",
+                    "test_url3"
+                ],
+                "comparing_price": "0.00",
+                "comparing_price_ratio": "0.0"
+            },
             "contract_detail": [
                 {
                     "contract_date": now,
@@ -427,60 +596,58 @@ class ProductDetailTest(TestCase):
                     "contract_price": "2000.00"
                 }
             ],
-            "contract_all": [
-                {
-                    "contract_date": now,
-                    "contract_price": "2000.00"
-                },
-                {
-                    "contract_date": now,
-                    "contract_price": "2000.00"
-                }
-            ],
-            "bidding_detail": [
-                {
-                    "selling_bidding": [
-                        {
-                            "selling_bidding_date": now,
-                            "selling_bidding_price": "2000.00"
-                        },
-                        {
-                            "selling_bidding_date": now,
-                            "selling_bidding_price": "2000.00"
-                        },
-                        {
-                            "selling_bidding_date": now,
-                            "selling_bidding_price": "2000.00"
-                        }
-                    ],
-                    "buying_bidding": [
-                        {
-                            "buying_bidding_date": now,
-                            "buying_bidding_price": "2000.00"
-                        },
-                        {
-                            "buying_bidding_date": now,
-                            "buying_bidding_price": "2000.00"
-                        },
-                        {
-                            "buying_bidding_date": now,
-                            "buying_bidding_price": "2000.00"
-                        }
-                    ]
-                }
-            ],
-            "product_info": [
-                {
-                    "model_number": 1,
-                    "author": "김작가",
-                    "color": [
-                        "Red"
-                    ],
-                    "original_price": "2000.00"
-                }
-            ]
+            "chart_url": "/products/1/chart",
+            "bidding_detail": {
+                "selling_bidding": [
+                    {
+                        "selling_bidding_date": now,
+                        "selling_bidding_price": "2000.00"
+                    },
+                    {
+                        "selling_bidding_date": now,
+                        "selling_bidding_price": "2000.00"
+                    }
+                ],
+                "buying_bidding": [
+                    {
+                        "buying_bidding_date": now,
+                        "buying_bidding_price": "2000.00"
+                    },
+                    {
+                        "buying_bidding_date": now,
+                        "buying_bidding_price": "2000.00"
+                    }
+                ]
+            },
+            "product_info": {
+                "model_number": 1,
+                "author": "김작가",
+                "color": [
+                    "Red"
+                ],
+                "original_price": "2000.00"
+            }
         })
 
+    def test_product_detail_get_query_count(self):
+        client = Client()
+        order_books.get(1)
+
+        with self.assertNumQueries(4):
+            response = client.get('/products/1?contract_choice=3m')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_detail_get_window_filtered(self):
+        client = Client()
+        Contract.objects.update(created_at=datetime.now() - timezone.timedelta(days=40))
+
+        response = client.get('/products/1?contract_choice=1m')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["contract_detail"], [])
+        self.assertEqual(response.json()["main_info"]["recent_price"], "2000.00")
+
     def test_product_detail_get_product_not_found(self):
         client   = Client()
         response = client.get('/products/1000000000')
@@ -500,3 +667,101 @@ class ProductDetailTest(TestCase):
         Bidding.objects.all().delete()
         ExpiredWithin.objects.all().delete()
         Contract.objects.all().delete()
+
+class ProductCardQueryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(
+            id   = 1,
+            name = "Bianka Anastazija"
+        )
+
+        Product.objects.bulk_create([
+            Product(
+                id                    = product_id,
+                name                  = f"poster {product_id}",
+                current_buying_price  = 10000,
+                current_selling_price = 10000,
+                original_price        = product_id,
+                author                = author
+            ) for product_id in range(1, 1001)
+        ])
+
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product_id = product_id,
+                image_url  = f"image_{product_id}"
+            ) for product_id in range(1, 1001)
+        ])
+
+    def setUp(self):
+        facet_index.build()
+
+    def test_productview_query_count_is_flat(self):
+        client = Client()
+
+        for limit in [1, 1000]:
+            with self.assertNumQueries(2):
+                response = client.get('/products', {"limit": limit})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), limit)
+            self.assertEqual(response.json()["results"][-1]["image"], [f"image_{limit}"])
+
+class BestAuthorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        status         = Status.objects.create(id = 1, name = "입찰중")
+        expired_within = ExpiredWithin.objects.create(id = 1, period = 1)
+
+        for author_id, bidding_count in [(1, 1), (2, 3), (3, 2)]:
+            author  = Author.objects.create(id = author_id, name = f"author {author_id}")
+            product = Product.objects.create(
+                id                    = author_id,
+                name                  = f"poster {author_id}",
+                current_buying_price  = 0,
+                current_selling_price = 0,
+                original_price        = 10000,
+                author                = author
+            )
+            for _ in range(bidding_count):
+                Bidding.objects.create(
+                    is_seller      = 0,
+                    product        = product,
+                    price          = 10000,
+                    status         = status,
+                    expired_within = expired_within
+                )
+
+        Bidding.objects.filter(product_id=2).update(created_at=datetime.now() - timezone.timedelta(days=2))
+
+    def setUp(self):
+        call_command('rebuild_author_ranking', stdout=StringIO())
+
+    def test_bestauthorview_get_all_time(self):
+        client   = Client()
+        response = client.get('/products/bestauthor')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([author["author_id"] for author in response.json()["results"]], [2, 3, 1])
+
+    def test_bestauthorview_get_window(self):
+        client   = Client()
+        response = client.get('/products/bestauthor?window=24h')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([author["author_id"] for author in response.json()["results"]], [3, 1])
+
+    def test_bestauthorview_get_invalid_window(self):
+        client   = Client()
+        response = client.get('/products/bestauthor?window=1y')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"message": "INVALID_WINDOW"})
+
+    def test_bestauthorview_get_limit(self):
+        client = Client()
+
+        self.assertEqual(len(client.get('/products/bestauthor?limit=-1').json()["results"]), 1)
+        self.assertEqual(len(client.get('/products/bestauthor?limit=2').json()["results"]), 2)
+        self.assertEqual(client.get('/products/bestauthor?limit=many').json(), {"message": "INVALID_LIMIT"})
@@ -1,10 +1,12 @@
 from django.urls import path
 
-from products.views import ProductView, CategoryView, BestAuthorView,ProductDetailView
+from products.views import ProductView, CategoryView, FacetView, BestAuthorView,ProductDetailView, ProductChartView
 
 urlpatterns = [
     path('/bestauthor', BestAuthorView.as_view()),
     path('', ProductView.as_view()),
     path('/category', CategoryView.as_view()),
-    path('/<int:product_id>', ProductDetailView.as_view())
+    path('/facets', FacetView.as_view()),
+    path('/<int:product_id>', ProductDetailView.as_view()),
+    path('/<int:product_id>/chart', ProductChartView.as_view())
 ]
@@ -1,30 +1,47 @@
 
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from dateutil.relativedelta import relativedelta
 
-from django.http import JsonResponse
-from django.db.models import Q, Prefetch, Count
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.db.models import Prefetch
 
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 
 from decorators import query_debugger
+from pagination import encode_cursor, decode_cursor, parse_limit, keyset_ordering, keyset_filter
 
-from products.models import Author, Theme, Color, Size, Product
+from products.models import Product, ProductImage, ProductColor
 from products.response import products_schema_dict
-from orders.models import Bidding, Contract
+from products.serializers import serialize_product_cards
+from products.categories import get_category_payload
+from products.ranking import RANKING_WINDOWS, get_best_authors
+from products.facets import FACETS, FACET_ID_LIMIT, facet_index, facet_filter, parse_facet_filters, count_bits, bit_ids
+from orders.models import Contract
+from orders.orderbook import order_books
+from orders.candles import CHART_RANGES, get_candles
 
 class BestAuthorView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = products_schema_dict)
     @query_debugger
     def get(self, request):
-        biddings = Count('product__bidding', filter = Q(product__bidding__is_seller=0))
-        popular_biddings = Author.objects.annotate(product_count = biddings).order_by('-product_count')[:4]
+        window = request.GET.get("window", "all")
+
+        if window not in RANKING_WINDOWS:
+            return JsonResponse({"message": "INVALID_WINDOW"}, status = 400)
+
+        try:
+            limit = parse_limit(request.GET.get("limit"), 4, 100)
+        except ValueError:
+            return JsonResponse({"message": "INVALID_LIMIT"}, status = 400)
+
         results = [
             {
-                "top_author" : topauthor.name,
-                "author_id"  : topauthor.id
-            } for topauthor in popular_biddings
+                "top_author" : author_name,
+                "author_id"  : author_id
+            } for author_id, author_name, *_ in get_best_authors(window, limit)
         ]
 
         return JsonResponse({"results": results}, status = 200)
@@ -33,165 +50,180 @@ class CategoryView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = products_schema_dict)
     @query_debugger
     def get(self, request):
-        authors  = Author.objects.all()
-        themes   = Theme.objects.all()
-        colors   = Color.objects.all()
-        sizes    = Size.objects.all()
+        payload = get_category_payload()
+        headers = {"ETag": payload["etag"], "Cache-Control": "no-cache"}
+        etags   = parse_etags(request.headers.get("If-None-Match", ""))
+
+        if payload["etag"] in etags or "*" in etags:
+            return HttpResponseNotModified(headers = headers)
+
+        return HttpResponse(payload["body"], content_type = "application/json", headers = headers, status = 200)
+
+class FacetView(APIView):
+    @swagger_auto_schema(manual_parameters = [], responses = products_schema_dict)
+    @query_debugger
+    def get(self, request):
+        try:
+            filters = parse_facet_filters(request.GET)
+        except ValueError:
+            return JsonResponse({"message": "INVALID_FILTER"}, status = 400)
+
+        count  = count_bits(facet_index.match(filters))
+        counts = facet_index.facet_counts(filters)
+
         results = [
             {
-                "category_name"   : "author",
-                "category_name_kr": "작가",
-                "option"          : [
-                    {
-                        "name": author.name,
-                        "id"  : author.id
-                    } for author in authors
-                ]},
-            {
-                "category_name"   : "theme",
-                "category_name_kr": "테마",
-                "option"          : [
-                    {
-                        "name": theme.name,
-                        "id"  : theme.id
-                    } for theme in themes
-                ]},
-            {
-                "category_name"   : "color",
-                "category_name_kr": "색상",
-                "option"          : [
+                "category_name": facet,
+                "option"       : [
                     {
-                        "name": color.name,
-                        "id"  : color.id
-                    } for color in colors
-                ]},
-            {
-                "category_name"   : "size",
-                "category_name_kr": "크기",
-                "option"          : [
-                    {
-                        "name": size.name,
-                        "id"  : size.id
-                    } for size in sizes
-                ]}
+                        "id"   : value_id,
+                        "count": value_count
+                    } for value_id, value_count in counts[facet].items()
+                ]
+            } for facet in FACETS
         ]
-        return JsonResponse({"results": results}, status = 200)
+        return JsonResponse({"product_count": count, "results": results}, status = 200)
 
 class ProductView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = products_schema_dict)
     @query_debugger
     def get(self, request):
-        author_id = request.GET.getlist("author", None)
-        theme_id  = request.GET.getlist("theme", None)
-        color_id  = request.GET.getlist("color", None)
-        size_id   = request.GET.getlist("size", None)
         sort      = request.GET.get("sort", "original-price-ascending")
-        offset    = int(request.GET.get("offset", 0))
-        limit     = int(request.GET.get("limit", 100))
-        limit     = offset + limit
+        cursor    = request.GET.get("cursor", None)
         options   = {
             "selling-price-descending" : "-current_selling_price",
             "buying-price-ascending"   : "current_buying_price",
             "original-price-descending": "-original_price",
             "original-price-ascending" : "original_price"
         }
-        q = Q()
-        if author_id:
-            q &= Q(author_id__in = author_id)
-        if theme_id:
-            q &= Q(theme__in = theme_id)
-        if color_id:
-            q &= Q(color__in = color_id)
-        if size_id:
-            q &= Q(size__in = size_id)
-            
-        products = Product.objects.filter(q).order_by(options.get(sort, None))
-        count    = products.count()
-    
-        productslist = [
-            {
-            "author_id"     : product.author.id,
-            "product_id"    : product.id,
-            "product_name"  : product.name,
-            "product_price" : product.current_buying_price if sort == "buying-price-ascending" else\
-                                (product.current_selling_price if sort == "selling-price-descending" else product.original_price),
-            "sort_name"     : "즉시 구매가순" if sort == "buying-price-ascending" else\
-                                ("즉시 판매가순" if sort == "selling-price-descending" else "발매가순"),
-            "author_name"   : product.author.name,
-            "image"         : [image.image_url for image in product.productimage_set.all()],
-            } for product in products[offset:limit]
-        ]
-        return JsonResponse({"product_count": count, "results": productslist}, status = 200)
+        order_field = options.get(sort, "original_price")
+
+        try:
+            offset = max(0, int(request.GET.get("offset", 0)))
+            limit  = parse_limit(request.GET.get("limit"), 100, 1000)
+        except ValueError:
+            return JsonResponse({"message": "INVALID_LIMIT"}, status = 400)
+
+        try:
+            filters = parse_facet_filters(request.GET)
+        except ValueError:
+            return JsonResponse({"message": "INVALID_FILTER"}, status = 400)
+
+        matched  = facet_index.match(filters)
+        count    = count_bits(matched)
+        products = Product.objects.order_by(*keyset_ordering(order_field))
+
+        if count > FACET_ID_LIMIT:
+            products = products.filter(facet_filter(filters)).distinct()
+        elif any(filters.values()):
+            products = products.filter(id__in = bit_ids(matched))
+
+        if cursor is not None:
+            if cursor:
+                try:
+                    cursor_sort, last_value, last_id = decode_cursor(cursor, 3)
+                    last_value                       = Decimal(str(last_value))
+
+                    if cursor_sort != sort or not last_value.is_finite() or not isinstance(last_id, int):
+                        raise ValueError('INVALID_CURSOR')
+                except (ValueError, InvalidOperation):
+                    return JsonResponse({"message": "INVALID_CURSOR"}, status = 400)
+
+                products = products.filter(keyset_filter(order_field, last_value, last_id))
+            page = products[:limit]
+        else:
+            page = products[offset:offset + limit]
+
+        productslist = serialize_product_cards(page, sort)
+
+        if cursor is None:
+            return JsonResponse({"product_count": count, "results": productslist}, status = 200)
+
+        next_cursor = None
+        if productslist and len(productslist) == limit:
+            last        = productslist[-1]
+            next_cursor = encode_cursor([sort, last["product_price"], last["product_id"]])
+
+        return JsonResponse({"product_count": count, "results": productslist, "next_cursor": next_cursor}, status = 200)
 
 class ProductDetailView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = products_schema_dict)
     @query_debugger
     def get(self, request, product_id):
-        if not Product.objects.filter(id=product_id).exists():
-            return JsonResponse({'message': 'INVALID_ERROR'}, status=404)     
-
-        product = Product.objects.prefetch_related(
-            'productcolor_set__color',
-            'bidding_set', 
-            'productimage_set',
-            Prefetch('bidding_set', queryset=Bidding.objects.filter(status_id=1, is_seller=1).order_by('-price', 'created_at'), to_attr="selling_bidding"),
-            Prefetch('bidding_set', queryset=Bidding.objects.filter(status_id=1, is_seller=0).order_by('-price', 'created_at'), to_attr="buying_bidding"),
-        ).get(id=product_id)
-        
         contract_choice = request.GET.get('contract_choice', '1w')
         contract_period = {
-            '3m': datetime.now() - relativedelta(months=3),
-            '1m': datetime.now() - relativedelta(months=1),
-            '1w': datetime.now() - timedelta(weeks=1)
+            '3m': relativedelta(months=3),
+            '1m': relativedelta(months=1),
+            '1w': timedelta(weeks=1)
         }
-        contract_all = Contract.objects.select_related('selling_bid__product').filter(selling_bid__product=product_id)
-        contracts    = contract_all.filter(created_at__range=(contract_period[contract_choice], datetime.now())).order_by('-created_at')
 
-        if contracts.count() >= 2:
-            latest_price          = contracts[0].selling_bid.price
-            old_price             = contracts[1].selling_bid.price
+        if contract_choice not in contract_period:
+            return JsonResponse({'message': 'INVALID_CONTRACT_CHOICE'}, status=400)
+
+        product = Product.objects.select_related('author').prefetch_related(
+            Prefetch('productimage_set', queryset=ProductImage.objects.order_by('id')),
+            Prefetch('productcolor_set', queryset=ProductColor.objects.select_related('color').order_by('id')),
+        ).filter(id=product_id).first()
+
+        if not product:
+            return JsonResponse({'message': 'INVALID_ERROR'}, status=404)
+
+        selling_bidding = order_books.depth(product_id, is_seller=True)
+        buying_bidding  = order_books.depth(product_id, is_seller=False)
+
+        now       = datetime.now()
+        history   = Contract.objects.filter(selling_bid__product_id=product_id).order_by('-created_at', '-id')
+        contracts = list(
+            history.filter(created_at__gte=now - contract_period[contract_choice], created_at__lte=now)
+                   .values_list('created_at', 'selling_bid__price')
+        )
+
+        # an empty window says nothing about the last trade, so only then look further back
+        if contracts:
+            recent_price = contracts[0][1]
+        else:
+            recent_price = history.values_list('selling_bid__price', flat=True).first() or 0
+
+        if len(contracts) >= 2:
+            latest_price          = contracts[0][1]
+            old_price             = contracts[1][1]
             comparing_price       = latest_price - old_price
             comparing_price_ratio = round((comparing_price / old_price) * 100, 1)
         else:
-            latest_price = comparing_price = comparing_price_ratio = 0
+            comparing_price = comparing_price_ratio = 0
 
         main_info = {
             'name'                     : product.name,
-            'recent_price'             : contracts[0].selling_bid.price if contracts[0].selling_bid.price else 0,
-            'oldest_selling_bidding_id': product.selling_bidding[0].id if product.selling_bidding else None,
-            'oldest_buying_bidding_id' : product.buying_bidding[0].id if product.buying_bidding else None,
-            'current_selling_price'    : product.selling_bidding[0].price if product.selling_bidding else None,
-            'current_buying_price'     : product.buying_bidding[0].price if product.buying_bidding else None,
+            'recent_price'             : recent_price,
+            'oldest_selling_bidding_id': selling_bidding[0].id if selling_bidding else None,
+            'oldest_buying_bidding_id' : buying_bidding[0].id if buying_bidding else None,
+            'current_selling_price'    : selling_bidding[0].price if selling_bidding else None,
+            'current_buying_price'     : buying_bidding[0].price if buying_bidding else None,
             'image_url'                : [image.image_url for image in product.productimage_set.all()],
             'comparing_price'          : comparing_price,
             'comparing_price_ratio'    : comparing_price_ratio
         }
 
-        contract_all = [{
-            'contract_date' : contract.created_at.strftime('%Y-%m-%d'), 
-            'contract_price': contract.selling_bid.price
-        } for contract in contract_all]
-
         contract_detail = [{
-            'contract_date' : contract.created_at.strftime('%Y-%m-%d'),
-            'contract_price': contract.selling_bid.price
-        } for contract in contracts]
+            'contract_date' : created_at.strftime('%Y-%m-%d'),
+            'contract_price': price
+        } for created_at, price in contracts]
 
         bidding_detail  = {
             'selling_bidding': [{
-                'selling_bidding_date' : selling_bidding.created_at.strftime('%Y-%m-%d'),
-                'selling_bidding_price' : selling_bidding.price
-            } for selling_bidding in product.selling_bidding],
+                'selling_bidding_date' : bidding.created_at.strftime('%Y-%m-%d'),
+                'selling_bidding_price' : bidding.price
+            } for bidding in selling_bidding],
             'buying_bidding': [{
-                'buying_bidding_date': buying_bidding.created_at.strftime('%Y-%m-%d'),
-                'buying_bidding_price': buying_bidding.price
-            } for buying_bidding in product.buying_bidding],
+                'buying_bidding_date': bidding.created_at.strftime('%Y-%m-%d'),
+                'buying_bidding_price': bidding.price
+            } for bidding in buying_bidding],
         }
 
         product_info = {
             'model_number'  : product_id,
-            'author'        : product.author.name,
-            'color'         : [product_color.color.name for product_color in product.productcolor_set.all()],
+            'author'        : product.author.name if product.author else None,
+            'color'         : [product_color.color.name for product_color in product.productcolor_set.all() if product_color.color],
             'original_price': product.original_price
         }
 
@@ -199,7 +231,27 @@ class ProductDetailView(APIView):
             'message'        : 'SUCCESS',
             'main_info'      : main_info,
             'contract_detail': contract_detail,
-            'contract_all'   : contract_all,
+            'chart_url'      : f'/products/{product_id}/chart',
             'bidding_detail' : bidding_detail,
             'product_info'   : product_info},
-        status=200)
\ No newline at end of file
+        status=200)
+
+class ProductChartView(APIView):
+    @swagger_auto_schema(manual_parameters = [], responses = products_schema_dict)
+    @query_debugger
+    def get(self, request, product_id):
+        chart_range = request.GET.get('range', '1w')
+
+        if chart_range not in CHART_RANGES:
+            return JsonResponse({'message': 'INVALID_RANGE'}, status=400)
+
+        results = [{
+            'date'  : candle['started_at'].strftime('%Y-%m-%d %H:%M'),
+            'open'  : candle['open'],
+            'high'  : candle['high'],
+            'low'   : candle['low'],
+            'close' : candle['close'],
+            'volume': candle['volume']
+        } for candle in get_candles(product_id, chart_range)]
+
+        return JsonResponse({'message': 'SUCCESS', 'results': results}, status=200)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import hashlib, math, threading, time
+
+from django.db import close_old_connections
+
+from users.models import User
+
+# users created by other processes or with bulk_create() never reach this
+# process's add(), so the filter is rebuilt in the background this often.
+SIGNUP_FILTER_TTL = 600
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.size   = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits   = bytearray(math.ceil(self.size / 8))
+
+    def positions(self, value):
+        digest = hashlib.sha256(value.encode('utf-8')).digest()
+        first  = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:16], 'little') | 1
+
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+# emails and phone numbers of existing users. a miss means the value is new
+# here, so signup goes straight to the insert and lets the unique constraints
+# catch anything another process created; a hit still checks the database.
+# the table scan runs in a background thread and the new filter is swapped in,
+# so no request waits on it; until the first build every check is a hit.
+class SignupFilter:
+    def __init__(self, error_rate=0.01, headroom=2, ttl=SIGNUP_FILTER_TTL):
+        self.error_rate = error_rate
+        self.headroom   = headroom
+        self.ttl        = ttl
+        self.lock       = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.bloom    = None
+            self.count    = 0
+            self.capacity = 0
+            self.checks   = 0
+            self.maybes   = 0
+            self.built_at = None
+            self.pending  = None
+            self.building = False
+
+    # values added while the scan runs are queued and replayed on the new filter
+    def build(self):
+        with self.lock:
+            self.pending = []
+
+        try:
+            capacity = max(10000, User.objects.count() * 2 * self.headroom)
+            bloom    = BloomFilter(capacity, self.error_rate)
+            count    = 0
+
+            for email, phone_number in User.objects.values_list('email', 'phone_number').iterator(chunk_size=10000):
+                count += self._add(bloom, email, phone_number)
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+
+        with self.lock:
+            for email, phone_number in self.pending:
+                count += self._add(bloom, email, phone_number)
+
+            self.pending = None
+            self.bloom, self.count, self.capacity, self.built_at = bloom, count, capacity, time.monotonic()
+
+    def build_in_thread(self):
+        try:
+            self.build()
+        finally:
+            self.building = False
+            close_old_connections()
+
+    def build_in_background(self):
+        with self.lock:
+            if self.building:
+                return
+
+            self.building = True
+
+        threading.Thread(target=self.build_in_thread, daemon=True).start()
+
+    def is_stale(self):
+        return self.bloom is None or self.count > self.capacity or time.monotonic() - self.built_at > self.ttl
+
+    def might_exist(self, email, phone_number):
+        with self.lock:
+            if self.is_stale():
+                self.build_in_background()
+
+            self.checks += 1
+            exists       = self.bloom is None or f'email:{email}' in self.bloom or f'phone:{phone_number}' in self.bloom
+            self.maybes += exists
+
+            return exists
+
+    def add(self, email, phone_number):
+        with self.lock:
+            if self.bloom is not None:
+                self.count += self._add(self.bloom, email, phone_number)
+
+            if self.pending is not None:
+                self.pending.append((email, phone_number))
+
+    def _add(self, bloom, email, phone_number):
+        values = [value for value in (email and f'email:{email}', phone_number and f'phone:{phone_number}') if value]
+
+        for value in values:
+            bloom.add(value)
+
+        return len(values)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'built'    : self.bloom is not None,
+                'building' : self.building,
+                'count'    : self.count,
+                'capacity' : self.capacity,
+                'size_bits': self.bloom.size if self.bloom else 0,
+                'checks'   : self.checks,
+                'maybes'   : self.maybes,
+            }
+
+signup_filter = SignupFilter()
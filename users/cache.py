@@ -0,0 +1,41 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from lrucache     import TTLCache
+from users.models import User
+
+# only the columns most requests need; anything else on request.user is a
+# deferred field and loads from the database on first access.
+USER_FIELDS = ('id', 'email', 'name', 'token_version')
+
+user_cache    = TTLCache(maxsize=10000, ttl=60)
+version_cache = TTLCache(maxsize=100000, ttl=60)
+
+def get_cached_user(user_id):
+    values = user_cache.get(user_id)
+
+    if values is None:
+        values = User.objects.filter(id=user_id).values_list(*USER_FIELDS).first()
+
+        if values is None:
+            return None
+
+        user_cache.set(user_id, values)
+
+    return User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+
+def get_token_version(user_id):
+    version = version_cache.get(user_id)
+
+    if version is None:
+        version = User.objects.filter(id=user_id).values_list('token_version', flat=True).first()
+
+        if version is None:
+            return None
+
+        version_cache.set(user_id, version)
+
+    return version
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+    version_cache.delete(user_id)
@@ -0,0 +1,66 @@
+import bcrypt, os, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+# half the cores, so request handling keeps the other half during a login storm
+HASHING_WORKERS    = max(1, (os.cpu_count() or 2) // 2)
+
+# every sign-in in the queue holds a request thread while it waits on the
+# result, so the queue is capped at half the server's threads; past that
+# sign-ins get a 503 and the other half stays free for the catalog.
+HASHING_QUEUE_SIZE = max(1, settings.WEB_THREADS // 2)
+
+# hashing threads run at the lowest priority, so on a busy box the scheduler
+# hands the cpu to request threads first and sign-ins absorb the wait.
+HASHING_NICENESS = 19
+
+class HashingBusy(Exception):
+    pass
+
+def hash_password(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def check_password(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+# linux applies a niceness given a thread id to that thread alone
+def lower_priority():
+    if sys.platform.startswith('linux'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), HASHING_NICENESS)
+        except OSError:
+            pass
+
+# bcrypt releases the gil, so a few threads keep the cores busy while request
+# threads wait on them. work beyond the queue size is refused up front instead
+# of holding another request thread behind a login storm.
+class HashingPool:
+    def __init__(self, workers=HASHING_WORKERS, queue_size=HASHING_QUEUE_SIZE):
+        self.executor   = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hashing', initializer=lower_priority)
+        self.queue_size = queue_size
+        self.pending    = 0
+        self.rejected   = 0
+        self.lock       = threading.Lock()
+
+    def submit(self, func, *args):
+        with self.lock:
+            if self.pending >= self.queue_size:
+                self.rejected += 1
+                raise HashingBusy()
+
+            self.pending += 1
+
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self.release)
+
+        return future
+
+    def release(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def call(self, func, *args):
+        return self.submit(func, *args).result()
+
+hashing_pool = HashingPool()
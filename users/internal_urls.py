@@ -0,0 +1,7 @@
+from django.urls import path
+
+from users.views import UserCacheMetricsView
+
+urlpatterns = [
+    path('/metrics', UserCacheMetricsView.as_view())
+]
@@ -0,0 +1,58 @@
+import hashlib, requests
+from requests.adapters import HTTPAdapter
+
+from lrucache import TTLCache
+
+KAKAO_API_URL = 'https://kapi.kakao.com'
+KAKAO_TIMEOUT = (1, 2)
+
+class KakaoError(Exception):
+    pass
+
+class KakaoUnauthorized(KakaoError):
+    pass
+
+def token_key(access_token):
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+# one session per process keeps connections to kakao open between logins;
+# profiles are cached under the token hash so the raw token is never a key.
+class KakaoClient:
+    def __init__(self, base_url=KAKAO_API_URL, timeout=KAKAO_TIMEOUT, pool_size=20, cache_ttl=60):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+
+        self.base_url = base_url
+        self.timeout  = timeout
+        self.cache    = TTLCache(maxsize=10000, ttl=cache_ttl)
+        self.session  = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_profile(self, access_token):
+        key     = token_key(access_token)
+        profile = self.cache.get(key)
+
+        if profile is not None:
+            return profile
+
+        try:
+            response = self.session.get(
+                f'{self.base_url}/v2/user/me',
+                headers = {'Authorization': f'Bearer {access_token}'},
+                timeout = self.timeout
+            )
+        except requests.RequestException as error:
+            raise KakaoError(str(error)) from error
+
+        if response.status_code == 401:
+            raise KakaoUnauthorized()
+
+        if response.status_code != 200:
+            raise KakaoError(f'kakao responded {response.status_code}')
+
+        profile = response.json()
+        self.cache.set(key, profile)
+
+        return profile
+
+kakao_client = KakaoClient()
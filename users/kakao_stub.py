@@ -0,0 +1,92 @@
+import json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from users.kakao import token_key
+
+def stub_profile(access_token):
+    kakao_id = int(token_key(access_token)[:12], 16)
+
+    return {
+        'id'           : kakao_id,
+        'connected_at' : '2021-07-23T11:25:47Z',
+        'kakao_account': {
+            'has_email'        : True,
+            'is_email_valid'   : True,
+            'is_email_verified': True,
+            'email'            : f'{kakao_id}@kakao.stub',
+        }
+    }
+
+# a local stand-in for kapi.kakao.com. tokens starting with 'invalid' get a
+# 401, failure_rate of the other requests get a 500, and every response waits
+# latency seconds first.
+class KakaoStubServer:
+    def __init__(self, latency=0, failure_rate=0, seed=None):
+        self.latency      = latency
+        self.failure_rate = failure_rate
+        self.random       = random.Random(seed)
+        self.requests     = 0
+        self.lock         = threading.Lock()
+        self.server       = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.server.daemon_threads = True
+        self.thread       = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}'
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests += 1
+                    failed = stub.random.random() < stub.failure_rate
+
+                time.sleep(stub.latency)
+                access_token = self.headers.get('Authorization', '').replace('Bearer ', '', 1)
+
+                if self.path != '/v2/user/me':
+                    return self.reply(404, {'msg': 'not found'})
+
+                if access_token.startswith('invalid'):
+                    return self.reply(401, {'msg': 'this access token does not exist', 'code': -401})
+
+                if failed:
+                    return self.reply(500, {'msg': 'internal error', 'code': -1})
+
+                self.reply(200, stub_profile(access_token))
+
+            def reply(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
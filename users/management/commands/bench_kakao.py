@@ -0,0 +1,70 @@
+import time
+from collections        import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from users.kakao      import KakaoClient, KakaoError, KakaoUnauthorized
+from users.kakao_stub import KakaoStubServer
+
+class Command(BaseCommand):
+    help = 'Benchmark Kakao profile lookups against a local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=1000)
+        parser.add_argument('--tokens', type=int, default=200, help='Distinct access tokens in the run')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--latency', type=float, default=0.02, help='Stub response delay in seconds')
+        parser.add_argument('--failure-rate', type=float, default=0)
+        parser.add_argument('--read-timeout', type=float, default=2)
+        parser.add_argument('--naive', action='store_true', help='New connection per call and no cache, as before')
+
+    def handle(self, *args, **options):
+        with KakaoStubServer(options['latency'], options['failure_rate'], seed=1) as stub:
+            client = KakaoClient(stub.url, timeout=(1, options['read_timeout']), pool_size=options['threads'])
+            lookup = self.naive_lookup(stub.url, options['read_timeout']) if options['naive'] else client.get_profile
+            tokens = [f'token-{index % options["tokens"]}' for index in range(options['logins'])]
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['threads']) as executor:
+                results = list(executor.map(lambda token: self.timed(lookup, token), tokens))
+            elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+        outcomes  = Counter(outcome for _, outcome in results)
+
+        self.stdout.write(
+            f'{len(results)} logins in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s), '
+            f'p50 {latencies[len(latencies) // 2] * 1000:.1f}ms p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms'
+        )
+        self.stdout.write(f'outcomes {dict(outcomes)}, stub requests {stub.requests}')
+        if not options['naive']:
+            self.stdout.write(f'profile cache {client.cache.stats()}')
+
+    def timed(self, lookup, token):
+        started = time.perf_counter()
+
+        try:
+            lookup(token)
+            outcome = 'ok'
+        except KakaoUnauthorized:
+            outcome = 'unauthorized'
+        except KakaoError:
+            outcome = 'error'
+
+        return time.perf_counter() - started, outcome
+
+    def naive_lookup(self, base_url, read_timeout):
+        def lookup(token):
+            try:
+                response = requests.get(f'{base_url}/v2/user/me', headers={'Authorization': f'Bearer {token}'}, timeout=(1, read_timeout))
+            except requests.RequestException as error:
+                raise KakaoError(str(error)) from error
+
+            if response.status_code != 200:
+                raise KakaoError(f'kakao responded {response.status_code}')
+
+            return response.json()
+
+        return lookup
@@ -0,0 +1,112 @@
+import json, time, threading
+from collections        import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock      import patch
+
+from django.conf                 import settings
+from django.core.management.base import BaseCommand
+from django.db                   import connection
+from django.test                 import Client
+
+from users.hashing import hash_password, hashing_pool
+from users.models  import User
+
+BENCH_EMAIL    = 'bench-login@gream.test'
+BENCH_PASSWORD = 'bench@1234'
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+# the server is one pool of --threads request threads, the way gunicorn's
+# gthread worker hands each request to one of its threads. catalog reads and
+# sign-ins queue for the same threads, so a latency includes the wait for a
+# free one.
+class Command(BaseCommand):
+    help = 'Measure catalog latency with and without a concurrent sign-in storm'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--reads', type=int, default=300)
+        parser.add_argument('--threads', type=int, default=settings.WEB_THREADS)
+        parser.add_argument('--queue-size', type=int, default=hashing_pool.queue_size)
+        parser.add_argument('--path', default='/products?limit=20')
+
+    def handle(self, *args, **options):
+        User.objects.get_or_create(email=BENCH_EMAIL, defaults={'password': hash_password(BENCH_PASSWORD)})
+
+        try:
+            with patch.object(hashing_pool, 'queue_size', options['queue_size']), \
+                 ThreadPoolExecutor(options['threads'], thread_name_prefix='request') as server:
+                baseline         = self.read_catalog(server, options['path'], options['reads'])
+                during, statuses = self.bench(server, options)
+        finally:
+            User.objects.filter(email=BENCH_EMAIL).delete()
+
+        self.stdout.write(f"{options['threads']} request threads, hashing queue {options['queue_size']}")
+
+        for label, latencies in [('catalog idle ', baseline), ('catalog storm', during)]:
+            self.stdout.write(f'{label}: p50 {percentile(latencies, 0.5):.1f}ms p99 {percentile(latencies, 0.99):.1f}ms')
+
+        self.stdout.write(self.style.SUCCESS(f'sign-ins: {dict(statuses)}'))
+
+    def request(self, method, path, body=None):
+        try:
+            if method == 'post':
+                return Client().post(path, body, content_type='application/json').status_code
+            return Client().get(path).status_code
+        finally:
+            connection.close()
+
+    def read_catalog(self, server, path, reads, stop=None):
+        latencies = []
+
+        for _ in range(reads):
+            if stop and stop.is_set():
+                break
+
+            started = time.perf_counter()
+            server.submit(self.request, 'get', path).result()
+            latencies.append(time.perf_counter() - started)
+
+        return latencies
+
+    def bench(self, server, options):
+        body      = json.dumps({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+        statuses  = Counter()
+        remaining = iter(range(options['logins']))
+        lock      = threading.Lock()
+        done      = threading.Event()
+
+        # each storm client sends its next sign-in once the last one answers
+        def storm_client():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+
+                status = server.submit(self.request, 'post', '/users/signin', body).result()
+
+                with lock:
+                    statuses[status] += 1
+
+        # only reads made while the storm is still running count
+        def storm():
+            clients = [threading.Thread(target=storm_client) for _ in range(options['concurrency'])]
+
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+
+            done.set()
+
+        waiter = threading.Thread(target=storm)
+        waiter.start()
+
+        during = self.read_catalog(server, options['path'], options['reads'], stop=done)
+
+        waiter.join()
+
+        return during, statuses
@@ -0,0 +1,21 @@
+from django.db                import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch          import receiver
+
+from users.bloom  import signup_filter
+from users.cache  import invalidate_user
+from users.models import User
+
+# other processes keep their copy until the ttl runs out, and so does this one
+# for queryset.update(), which sends no signal.
+@receiver([post_save, post_delete], sender=User)
+def refresh_user(sender, instance, **kwargs):
+    user_id = instance.id
+
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+@receiver(post_save, sender=User)
+def remember_signup_values(sender, instance, **kwargs):
+    values = (instance.email, instance.phone_number)
+    transaction.on_commit(lambda: signup_filter.add(*values))
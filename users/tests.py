@@ -1,10 +1,20 @@
-import json, bcrypt, jwt
+import json, bcrypt, jwt, os, sys, tempfile, threading, time, unittest
 from datetime       import datetime, timedelta
-from unittest.mock  import patch, MagicMock
+from io             import StringIO
+from unittest.mock  import patch
 
-from django.test    import TestCase, Client
+from django.test    import TestCase, Client, override_settings
+from django.core.management import call_command
 
 from users.models   import User
+from users.cache    import user_cache, version_cache, get_cached_user
+from users.tokens   import issue_token, revoke_tokens
+from users.kakao    import kakao_client
+from users.kakao_stub import KakaoStubServer, stub_profile
+from users.bloom    import BloomFilter, signup_filter
+from users.hashing  import HASHING_NICENESS, HashingBusy, HashingPool, hashing_pool, hash_password
+from lrucache       import TTLCache
+from utils          import decode_token, token_cache, token_timings
 from gream.settings import SECRET_KEY, ALGORITHMS
 
 class SignupTest(TestCase):
@@ -16,6 +26,7 @@ class SignupTest(TestCase):
             phone_number = '01090908080',
             name         = '김코드'
         )
+        signup_filter.build()
 
     def tearDown(self):
         User.objects.all().delete()
@@ -258,6 +269,52 @@ class SigninTest(TestCase):
     def tearDown(self):
         User.objects.all().delete()
 
+class HashingPoolTest(TestCase):
+    def setUp(self):
+        User.objects.create(
+            id           = 1,
+            email        = 'kimcode@gmail.com',
+            password     = hash_password('1234@yyyy'),
+            phone_number = '01090908080',
+            name         = '김코드'
+        )
+
+    def test_pool_rejects_work_past_queue_size(self):
+        pool    = HashingPool(workers=1, queue_size=1)
+        release = threading.Event()
+        future  = pool.submit(release.wait)
+
+        with self.assertRaises(HashingBusy):
+            pool.submit(hash_password, '1234@yyyy')
+
+        release.set()
+        future.result()
+
+        self.assertEqual(pool.rejected, 1)
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'thread niceness is linux only')
+    def test_pool_threads_run_at_low_priority(self):
+        before = os.getpriority(os.PRIO_PROCESS, 0)
+        pool   = HashingPool(workers=1)
+        nice   = pool.call(lambda: os.getpriority(os.PRIO_PROCESS, threading.get_native_id()))
+
+        self.assertEqual(nice, HASHING_NICENESS)
+        self.assertEqual(os.getpriority(os.PRIO_PROCESS, 0), before)
+
+    def test_signinview_post_busy(self):
+        client = Client()
+        user   = {
+            'email'   :'kimcode@gmail.com',
+            'password':'1234@yyyy'
+        }
+
+        with patch.object(hashing_pool, 'queue_size', 0):
+            response = client.post('/users/signin', json.dumps(user), content_type='application/json')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'message': 'BUSY'})
+        self.assertEqual(response['Retry-After'], '1')
+
 class UserTest(TestCase):
     def setUp(self):
         User.objects.create(
@@ -300,26 +357,275 @@ class UserTest(TestCase):
                     }
                 }})
 
+    def test_userview_get_reuses_cached_token_version(self):
+        client = Client()
+        version_cache.clear()
+
+        client.get('/users/info', **headers)
+
+        with self.assertNumQueries(1):
+            response = client.get('/users/info', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(version_cache.stats()['hits'], 1)
+
+    def test_userview_get_revoked_token(self):
+        client = Client()
+
+        revoke_tokens(1)
+        response = client.get('/users/info', **headers)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'REVOKED_TOKEN'})
+        self.assertEqual(client.get('/users/info', HTTP_AUTHORIZATION=issue_token(User.objects.get(id=1))).status_code, 200)
+
+    def test_user_cache_invalidated_on_save(self):
+        user_cache.clear()
+        get_cached_user(1)
+
+        user      = User.objects.get(id=1)
+        user.name = '김코드'
+        user.save()
+
+        self.assertEqual(get_cached_user(1).name, '김코드')
+        self.assertEqual(user_cache.stats()['misses'], 2)
+
+    @override_settings(INTERNAL_API_TOKEN='internal-secret')
+    def test_user_metrics_get(self):
+        client = Client()
+        version_cache.clear()
+
+        client.get('/users/info', **headers)
+        response = client.get('/internal/users/metrics', HTTP_X_INTERNAL_TOKEN='internal-secret')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results']['version_cache']['misses'], 1)
+
+    @override_settings(INTERNAL_API_TOKEN='internal-secret')
+    def test_user_metrics_get_internal_only(self):
+        client = Client()
+
+        self.assertEqual(client.get('/internal/users/metrics').status_code, 403)
+        self.assertEqual(client.get('/internal/users/metrics', HTTP_X_INTERNAL_TOKEN='guess').status_code, 403)
+        self.assertEqual(client.get('/users/metrics', HTTP_X_INTERNAL_TOKEN='internal-secret').status_code, 404)
+
+class TokenCacheTest(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        token_timings.clear()
+
+    def test_decode_token_reuses_verified_payload(self):
+        access_token = jwt.encode({"user_id" : 1}, SECRET_KEY, ALGORITHMS)
+
+        with patch('utils.jwt.decode', wraps=jwt.decode) as decode:
+            decode_token(access_token)
+            payload = decode_token(access_token)
+
+        self.assertEqual(payload, {"user_id" : 1})
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertIn('saved_ms_per_request', token_timings.stats())
+
+    def test_decode_token_evicts_at_exp(self):
+        access_token = jwt.encode({"user_id" : 1, "exp": datetime.utcnow() + timedelta(seconds=30)}, SECRET_KEY, ALGORITHMS)
+        decode_token(access_token)
+
+        with patch.object(token_cache, 'timer', lambda: time.monotonic() + 31):
+            self.assertEqual(len(token_cache.entries), 1)
+            self.assertIsNone(token_cache.get(next(iter(token_cache.entries))))
+
+    @override_settings(INTERNAL_API_TOKEN='internal-secret')
+    def test_user_metrics_get_reports_token_cache(self):
+        client       = Client()
+        access_token = jwt.encode({"user_id" : 1}, SECRET_KEY, ALGORITHMS)
+
+        client.get('/users/info', HTTP_AUTHORIZATION=access_token)
+        client.get('/users/info', HTTP_AUTHORIZATION=access_token)
+
+        token_stats = client.get('/internal/users/metrics', HTTP_X_INTERNAL_TOKEN='internal-secret').json()['results']['token_cache']
+
+        self.assertEqual((token_stats['hits'], token_stats['misses']), (1, 1))
+
+class ImportUsersTest(TestCase):
+    def setUp(self):
+        User.objects.create(email='kimcode@gmail.com', phone_number='01090908080', name='김코드')
+
+    def import_users(self, suffix, content):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8') as source:
+            source.write(content)
+        self.addCleanup(os.remove, source.name)
+
+        out = StringIO()
+        call_command('import_users', source.name, '--workers', '1', stdout=out)
+
+        return out.getvalue()
+
+    def test_import_users_from_jsonl(self):
+        rows = [
+            {'email': 'leecode@gmail.com', 'password': '1234@yyyy', 'phone_number': '01090901111', 'name': '이코드'},
+            {'email': 'kimcode@gmail.com', 'password': '1234@yyyy', 'phone_number': '01011112222', 'name': '김코드'},
+            {'email': 'parkcode@gmail.com', 'password': '1234@yyyy', 'phone_number': '01090901111', 'name': '박코드'},
+            {'email': 'not-an-email', 'password': '1234@yyyy'},
+        ]
+        output = self.import_users('.jsonl', '\n'.join(json.dumps(row) for row in rows))
+        user   = User.objects.get(email='leecode@gmail.com')
+
+        self.assertIn('Imported 1 users', output)
+        self.assertTrue(bcrypt.checkpw('1234@yyyy'.encode('utf-8'), user.password.encode('utf-8')))
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_import_users_skips_invalid_lines(self):
+        signup_filter.build()
+
+        lines = [
+            json.dumps({'email': 'leecode@gmail.com', 'password': '1234@yyyy', 'phone_number': '01090901111', 'name': '이코드'}),
+            json.dumps({'email': 'parkcode@gmail.com', 'password': 'password', 'phone_number': '01090902222'}),
+            json.dumps(['choicode@gmail.com', '1234@yyyy']),
+            '{"email": "jeongcode@gmail.com",',
+        ]
+        output = self.import_users('.jsonl', '\n'.join(lines))
+
+        self.assertIn("skipped {'invalid': 3}", output)
+        self.assertEqual(User.objects.filter(email='leecode@gmail.com').count(), 1)
+
+        signup_filter.build()
+        self.assertTrue(signup_filter.might_exist('leecode@gmail.com', None))
+
+    def test_import_users_from_csv(self):
+        output = self.import_users('.csv', 'email,password,phone_number,name\nleecode@gmail.com,1234@yyyy,01090901111,이코드\n')
+
+        self.assertIn('Imported 1 users', output)
+        self.assertEqual(User.objects.get(email='leecode@gmail.com').name, '이코드')
+
+class SignupFilterTest(TestCase):
+    def setUp(self):
+        User.objects.create(email='kimcode@gmail.com', phone_number='01090908080', name='김코드')
+        signup_filter.clear()
+        signup_filter.build()
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom  = BloomFilter(1000, 0.01)
+        values = [f'user{index}@gmail.com' for index in range(1000)]
+
+        for value in values:
+            bloom.add(value)
+
+        false_positives = sum(f'other{index}@gmail.com' in bloom for index in range(1000))
+
+        self.assertTrue(all(value in bloom for value in values))
+        self.assertLess(false_positives, 50)
+
+    def test_signupview_post_new_user_skips_uniqueness_queries(self):
+        client = Client()
+        user   = {
+            'email'       :'leecode@gmail.com',
+            'password'    :'1234@yyyy',
+            'phone_number':'01090901111',
+            'name'        :'이코드'
+        }
+
+        with patch('users.views.is_duplicate') as is_duplicate:
+            response = client.post('/users/signup', json.dumps(user), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        is_duplicate.assert_not_called()
+
+    def test_signupview_post_duplicate_missed_by_filter(self):
+        client = Client()
+        user   = {
+            'email'       :'kimcode@gmail.com',
+            'password'    :'1234@yyyy',
+            'phone_number':'01090901111',
+            'name'        :'이코드'
+        }
+        signup_filter.bloom = BloomFilter(10000)
+
+        response = client.post('/users/signup', json.dumps(user), content_type='application/json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'message': 'DUPLICATE'})
+
+    def test_signup_filter_learns_new_users(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(email='leecode@gmail.com', phone_number='01090901111', name='이코드')
+
+        self.assertTrue(signup_filter.might_exist('leecode@gmail.com', None))
+        self.assertTrue(signup_filter.might_exist('kimcode@gmail.com', None))
+        self.assertFalse(signup_filter.might_exist('parkcode@gmail.com', '01000000000'))
+
+    def test_signup_filter_builds_in_background(self):
+        signup_filter.clear()
+
+        with patch.object(signup_filter, 'build_in_background') as build_in_background:
+            self.assertTrue(signup_filter.might_exist('parkcode@gmail.com', '01000000000'))
+
+        build_in_background.assert_called_once()
+
+        signup_filter.build()
+        signup_filter.built_at -= signup_filter.ttl + 1
+
+        with patch.object(signup_filter, 'build_in_background') as build_in_background:
+            self.assertFalse(signup_filter.might_exist('parkcode@gmail.com', '01000000000'))
+
+        build_in_background.assert_called_once()
+
+    def test_signup_filter_keeps_values_added_during_build(self):
+        signup_filter.clear()
+        scan = User.objects.values_list
+
+        def add_during_scan(*fields):
+            signup_filter.add('leecode@gmail.com', None)
+            return scan(*fields)
+
+        with patch.object(User.objects, 'values_list', side_effect=add_during_scan):
+            signup_filter.build()
+
+        self.assertTrue(signup_filter.might_exist('leecode@gmail.com', None))
+
+class TTLCacheTest(TestCase):
+    def test_evicts_least_recently_used_and_expired_entries(self):
+        now   = [0]
+        cache = TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), 'a')
+
+        now[0] = 11
+
+        self.assertIsNone(cache.get(3))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
 class KakaoSignupTest(TestCase):
-    @patch("users.views.requests")
-    def test_kakao_signin_new_user_success(self, mocked_requests):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = KakaoStubServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        kakao_client.cache.clear()
+        self.stub.latency      = 0
+        self.stub.failure_rate = 0
+        self.stub.requests     = 0
+
+        patcher = patch.object(kakao_client, 'base_url', self.stub.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_kakao_signin_new_user_success(self):
         client = Client()
 
-        class MockedResponse:
-            def json(self):
-                return {
-                    'id': 1234567899, 
-                    'connected_at': '2021-07-23T11:25:47Z', 
-                    'kakao_account': {
-                        'has_email': True, 
-                        'email_needs_agreement': False, 
-                        'is_email_valid': True, 
-                        'is_email_verified': True, 
-                        'email': 'kakaologin@naver.com'}
-                }
-        
-        mocked_requests.get = MagicMock(return_value = MockedResponse())
-        headers             = {"Authoriazation":"fake access_token"}
+        headers             = {"HTTP_AUTHORIZATION":"fake access_token"}
         response            = client.get("/users/signin/kakao", **headers)
         access_token        = response.json()['TOKEN']
 
@@ -329,4 +635,40 @@ class KakaoSignupTest(TestCase):
                 'message':'SUCCESS',
                 'TOKEN':access_token
             }
-        )
\ No newline at end of file
+        )
+        self.assertEqual(User.objects.get().email, stub_profile('fake access_token')['kakao_account']['email'])
+
+    def test_kakao_signin_reuses_cached_profile(self):
+        client  = Client()
+        headers = {"HTTP_AUTHORIZATION":"fake access_token"}
+
+        client.get("/users/signin/kakao", **headers)
+        response = client.get("/users/signin/kakao", **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.requests, 1)
+
+    def test_kakao_signin_invalid_token(self):
+        client   = Client()
+        response = client.get("/users/signin/kakao", HTTP_AUTHORIZATION="invalid token")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'INVALID_TOKEN'})
+
+    def test_kakao_signin_kakao_unavailable(self):
+        client = Client()
+        self.stub.failure_rate = 1
+
+        response = client.get("/users/signin/kakao", HTTP_AUTHORIZATION="fake access_token")
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json(), {'message': 'KAKAO_UNAVAILABLE'})
+
+    def test_kakao_signin_times_out(self):
+        client = Client()
+        self.stub.latency = 0.5
+
+        with patch.object(kakao_client, 'timeout', (1, 0.1)):
+            response = client.get("/users/signin/kakao", HTTP_AUTHORIZATION="fake access_token")
+
+        self.assertEqual(response.status_code, 502)
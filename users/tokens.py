@@ -0,0 +1,21 @@
+import jwt
+from datetime import datetime, timedelta
+
+from django.db.models import F
+
+from gream.settings import SECRET_KEY, ALGORITHMS
+from users.cache    import invalidate_user
+from users.models   import User
+
+TOKEN_LIFETIME = timedelta(days=1)
+
+def issue_token(user):
+    payload = {'user_id': user.id, 'ver': user.token_version, 'exp': datetime.utcnow() + TOKEN_LIFETIME}
+
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHMS)
+
+# every token issued before this call stops verifying; queryset.update() sends
+# no signal, so this process drops its cached copies itself.
+def revoke_tokens(user_id):
+    User.objects.filter(id=user_id).update(token_version=F('token_version') + 1)
+    invalidate_user(user_id)
@@ -1,11 +1,15 @@
-import re, json, bcrypt, jwt, requests
-from datetime import datetime, timedelta
+import re, json
 
 from django.http import JsonResponse
+from django.db import IntegrityError, transaction
 
 from users.models import User
-from gream.settings import SECRET_KEY, ALGORITHMS
-from utils import authorization
+from utils import authorization, internal_only, token_cache, token_timings
+from users.cache import user_cache, version_cache
+from users.tokens import issue_token
+from users.kakao import KakaoError, KakaoUnauthorized, kakao_client
+from users.bloom import signup_filter
+from users.hashing import HashingBusy, hashing_pool, hash_password, check_password
 
 from users.response import users_schema_dict
 
@@ -17,6 +21,22 @@ REGEX = {
     'password' : '^(?=.*[A-Za-z])(?=.*\d)(?=.*[@$!%#?&])[A-Za-z\d@$!%*#?&]{8,16}$'
 }
 
+def busy_response():
+    return JsonResponse({'message': 'BUSY'}, status=503, headers={'Retry-After': '1'})
+
+def get_signin_user(email):
+    return User.objects.filter(email=email).only('id', 'password', 'token_version').first()
+
+def is_duplicate(email, phone_number):
+    return User.objects.filter(email=email).exists() or User.objects.filter(phone_number=phone_number).exists()
+
+def is_known_duplicate(email, phone_number):
+    return signup_filter.might_exist(email, phone_number) and is_duplicate(email, phone_number)
+
+def create_user(**fields):
+    with transaction.atomic():
+        return User.objects.create(**fields)
+
 class SignupView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = users_schema_dict)
     def post(self, request):
@@ -30,17 +50,24 @@ class SignupView(APIView):
             if not re.match(REGEX['email'], email) or not re.match(REGEX['password'], password):
                 return JsonResponse({'message': 'INVALID_ERROR'}, status=400)
             
-            if User.objects.filter(email=email).exists() or User.objects.filter(phone_number=phone_number).exists():
+            if is_known_duplicate(email, phone_number):
                 return JsonResponse({'message': 'DUPLICATE'}, status=409)
-            
-            encoded_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-
-            User.objects.create(
-                email        = email,
-                password     = encoded_password.decode('utf-8'),
-                phone_number = phone_number,
-                name         = name
-            )
+
+            try:
+                encoded_password = hashing_pool.call(hash_password, password)
+            except HashingBusy:
+                return busy_response()
+
+            try:
+                create_user(
+                    email        = email,
+                    password     = encoded_password,
+                    phone_number = phone_number,
+                    name         = name
+                )
+            except IntegrityError:
+                return JsonResponse({'message': 'DUPLICATE'}, status=409)
+
             return JsonResponse({'message': 'SUCCESS'}, status=201)
         
         except KeyError:
@@ -50,18 +77,21 @@ class SigninView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = users_schema_dict)
     def post(self, request):
         try:
-            data = json.loads(request.body)
-
-            if not User.objects.filter(email=data['email']).exists():
-                return JsonResponse({'message': 'INVALID_USER'},status=401)
-            
+            data     = json.loads(request.body)
             email    = data['email']
             password = data['password']
-            user_id  = User.objects.get(email=email).id
+            user     = get_signin_user(email)
 
-            if bcrypt.checkpw(password.encode('utf-8'), User.objects.get(id=user_id).password.encode('utf-8')):
-                access_token = jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(days=1)}, SECRET_KEY, algorithm=ALGORITHMS)
-                return JsonResponse({'message': 'SUCCESS', 'TOKEN': access_token}, status=200)
+            if user is None or not user.password:
+                return JsonResponse({'message': 'INVALID_USER'},status=401)
+
+            try:
+                is_valid = hashing_pool.call(check_password, password, user.password)
+            except HashingBusy:
+                return busy_response()
+
+            if is_valid:
+                return JsonResponse({'message': 'SUCCESS', 'TOKEN': issue_token(user)}, status=200)
 
             return JsonResponse({'message': 'INVALID_USER'}, status=401)
         except KeyError:
@@ -69,9 +99,11 @@ class SigninView(APIView):
 
 class UserView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = users_schema_dict)
-    @authorization
+    @authorization(claims_only=True)
     def get(self, request):
-        user = request.user
+        user = User.objects.only(
+            'name', 'address', 'phone_number', 'card_company', 'card_number', 'bank_name', 'bank_account'
+        ).get(id=request.user_id)
 
         results = {
             'name': user.name,
@@ -87,16 +119,39 @@ class UserView(APIView):
 
         return JsonResponse({'results': results}, status=200)
 
+class UserCacheMetricsView(APIView):
+    @swagger_auto_schema(auto_schema = None)
+    @internal_only
+    def get(self, request):
+        results = {
+            'user_cache'   : user_cache.stats(),
+            'version_cache': version_cache.stats(),
+            'token_cache'  : {**token_cache.stats(), **token_timings.stats()},
+            'signup_filter': signup_filter.stats(),
+        }
+
+        return JsonResponse({'results': results}, status=200)
+
 class KakaoSigninView(APIView):
     @swagger_auto_schema(manual_parameters = [], responses = users_schema_dict)
     def get(self, request):
-        access_token     = request.headers.get('Authorization')
-        profile_request  = requests.get("https://kapi.kakao.com/v2/user/me", headers={"Authorization" : f"Bearer {access_token}"}).json()
+        access_token = request.headers.get('Authorization')
+
+        if not access_token:
+            return JsonResponse({'error': 'ACESS_TOKEN_REQUIRED'}, status=401)
+
+        try:
+            profile_request = kakao_client.get_profile(access_token)
+        except KakaoUnauthorized:
+            return JsonResponse({'error': 'INVALID_TOKEN'}, status=401)
+        except KakaoError:
+            return JsonResponse({'message': 'KAKAO_UNAVAILABLE'}, status=502)
+
         user, is_created = User.objects.get_or_create(kakao_id = profile_request["id"])
-        access_token     = jwt.encode({'user_id': user.id, 'exp': datetime.utcnow() + timedelta(days=1)}, SECRET_KEY, algorithm=ALGORITHMS)
+        access_token     = issue_token(user)
 
         if is_created:
             user.email = profile_request['kakao_account']["email"]
             user.save()
             return JsonResponse({'message': 'SUCCESS', 'TOKEN': access_token}, status=201)
-        return JsonResponse({'message': 'SUCCESS', 'TOKEN': access_token}, status=200)
\ No newline at end of file
+        return JsonResponse({'message': 'SUCCESS', 'TOKEN': access_token}, status=200)